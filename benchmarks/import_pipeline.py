@@ -0,0 +1,327 @@
+"""Benchmarks of playlists import and listen submission.
+
+The ListenBrainz API is replaced by an ``httpx.MockTransport``,
+MusicBrainz by an in-memory stand-in, Mopidy's core by a fake library
+holding ``LIBRARY_SIZE`` tracks, and the backend by the extension
+playlists provider. Measured:
+
+- wall time, ListenBrainz requests and peak memory of a first import
+  (``import_cold``) and of a second import with unchanged playlists
+  (``import_warm``);
+- listens submitted per second through the submitter
+  (``submission``).
+
+Results are compared to ``baseline.json``; The script exits with an
+error status when a measure regressed by more than ``--tolerance``.
+
+Run with::
+
+    python benchmarks/import_pipeline.py [--save-baseline]
+
+"""
+
+import argparse
+import json
+import pathlib
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List
+from unittest import mock
+
+import httpx
+import pykka
+from mopidy.models import Artist, Ref, SearchResult, Track
+
+from mopidy_listenbrainz.frontend import ListenbrainzFrontend
+from mopidy_listenbrainz.listenbrainz import (
+    MUSICBRAINZ_PLAYLIST_EXTENSION_URL,
+    Listenbrainz,
+    PreparedListen,
+)
+from mopidy_listenbrainz.musicbrainz import RecordingData
+from mopidy_listenbrainz.playlists import ListenbrainzPlaylistsProvider
+from mopidy_listenbrainz.submission import ListenSubmitter
+
+BASELINE_PATH = pathlib.Path(__file__).parent / "baseline.json"
+
+LIBRARY_SIZE = 100000
+PLAYLIST_COUNT = 20
+PLAYLIST_SIZE = 50
+SUBMISSION_COUNT = 2000
+
+# Measures where higher is better, others are costs
+HIGHER_IS_BETTER = {"listens_per_second"}
+
+
+def get_mbid(index: int) -> str:
+    return f"00000000-0000-0000-0000-{index:012d}"
+
+
+def future(value: Any) -> pykka.Future:
+    f = pykka.ThreadingFuture()
+    f.set(value)
+    return f
+
+
+class FakeLibrary:
+    """Library whose tracks are found by MBID, one track in two only
+    having a MusicBrainz identifier, and whose root directory holds all
+    tracks."""
+
+    def __init__(self, size: int) -> None:
+        self.tracks_by_mbid: Dict[str, Track] = {}
+        self.tracks_by_uri: Dict[str, Track] = {}
+        for index in range(size):
+            mbid = get_mbid(index)
+            track = Track(
+                uri=f"local:track:{index}",
+                name=f"Track {index}",
+                artists=[Artist(name=f"Artist {index % 1000}")],
+                musicbrainz_id=mbid if index % 2 == 0 else None,
+            )
+            if index % 2 == 0:
+                self.tracks_by_mbid[mbid] = track
+            self.tracks_by_uri[track.uri] = track
+
+    def search(self, query, uris=None, exact=False):
+        (mbid,) = query["musicbrainz_trackid"]
+        track = self.tracks_by_mbid.get(mbid)
+        tracks = [track] if track is not None else []
+        return future([SearchResult(uri="local:search", tracks=tracks)])
+
+    def browse(self, uri):
+        if uri is None:
+            return future([Ref.directory(uri="local:directory", name="Local")])
+        return future(
+            [
+                Ref.track(uri=track.uri, name=track.name)
+                for track in self.tracks_by_uri.values()
+            ]
+        )
+
+    def lookup(self, uris):
+        return future(
+            {
+                uri: (
+                    [self.tracks_by_uri[uri]]
+                    if uri in self.tracks_by_uri
+                    else []
+                )
+                for uri in uris
+            }
+        )
+
+
+class FakePlaylists:
+    """Proxy of the extension playlists provider."""
+
+    def __init__(self) -> None:
+        backend = mock.Mock(uri_schemes=["listenbrainz"])
+        self.provider = ListenbrainzPlaylistsProvider(backend)
+
+    def as_list(self):
+        return future(self.provider.as_list())
+
+    def lookup(self, uri):
+        return future(self.provider.lookup(uri))
+
+    def replace_recommendations(self, playlists):
+        return future(self.provider.replace_recommendations(playlists))
+
+
+class FakeMusicBrainz:
+    def get_recordings(self, mbids):
+        return {
+            mbid: RecordingData(mbid, f"Track {int(mbid[-12:])}", "Artist")
+            for mbid in mbids
+        }
+
+
+class FakeListenbrainzApi:
+    """Stand-in for ListenBrainz API, counting requests."""
+
+    def __init__(self) -> None:
+        self.request_count = 0
+        self.playlists = {
+            f"playlist-{p}": [
+                get_mbid((p * PLAYLIST_SIZE + t) * 37 % LIBRARY_SIZE)
+                for t in range(PLAYLIST_SIZE)
+            ]
+            for p in range(PLAYLIST_COUNT)
+        }
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.request_count += 1
+        path = request.url.path
+        if path.endswith("/playlists/createdfor"):
+            offset = int(request.url.params.get("offset", 0))
+            count = int(request.url.params.get("count", 25))
+            playlist_ids = list(self.playlists)[offset : offset + count]
+            return httpx.Response(
+                200,
+                json={
+                    "playlists": [
+                        {"playlist": self.get_playlist_dto(playlist_id, [])}
+                        for playlist_id in playlist_ids
+                    ]
+                },
+            )
+        elif path.startswith("/1/playlist/"):
+            playlist_id = path[len("/1/playlist/") :]
+            mbids = self.playlists[playlist_id]
+            return httpx.Response(
+                200,
+                json={"playlist": self.get_playlist_dto(playlist_id, mbids)},
+            )
+        elif path == "/1/validate-token":
+            return httpx.Response(200, json={"valid": True, "user_name": "u"})
+        return httpx.Response(200, json={"status": "ok"})
+
+    def get_playlist_dto(
+        self, playlist_id: str, mbids: List[str]
+    ) -> Dict[str, Any]:
+        return {
+            "identifier": f"https://listenbrainz.org/playlist/{playlist_id}",
+            "title": f"Playlist {playlist_id}",
+            "date": "2024-01-01T00:00:00+00:00",
+            "extension": {
+                MUSICBRAINZ_PLAYLIST_EXTENSION_URL: {
+                    "last_modified_at": "2024-01-01T00:00:00+00:00"
+                }
+            },
+            "track": [
+                {
+                    "identifier": f"https://musicbrainz.org/recording/{mbid}",
+                    "title": f"Track {int(mbid[-12:])}",
+                    "creator": f"Artist {int(mbid[-12:]) % 1000}",
+                }
+                for mbid in mbids
+            ],
+        }
+
+
+def get_listenbrainz(api: FakeListenbrainzApi) -> Listenbrainz:
+    lb = Listenbrainz(
+        "token",
+        "api.example.org",
+        {},
+        transport=httpx.MockTransport(api.handler),
+    )
+    lb.user_name = "u"
+    return lb
+
+
+def benchmark_import() -> Dict[str, Dict[str, float]]:
+    api = FakeListenbrainzApi()
+    core = mock.Mock()
+    core.library = FakeLibrary(LIBRARY_SIZE)
+    config = {"listenbrainz": {"import_concurrency": 4}}
+    frontend = ListenbrainzFrontend(config, core)
+    playlists = FakePlaylists()
+    frontend._get_playlists_provider = lambda: playlists
+    frontend.lb = get_listenbrainz(api)
+    frontend.musicbrainz = FakeMusicBrainz()
+
+    results = {}
+    for name in ("import_cold", "import_warm"):
+        api.request_count = 0
+        tracemalloc.start()
+        start = time.perf_counter()
+        frontend.import_playlists()
+        wall_time = time.perf_counter() - start
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = {
+            "wall_time_seconds": wall_time,
+            "requests": api.request_count,
+            "peak_memory_bytes": peak_memory,
+        }
+    return results
+
+
+def benchmark_submission() -> Dict[str, Dict[str, float]]:
+    api = FakeListenbrainzApi()
+    submitter = ListenSubmitter(
+        get_listenbrainz(api), max_queue_size=SUBMISSION_COUNT
+    )
+    listens = [
+        PreparedListen(f"Track {i}", "Artist") for i in range(SUBMISSION_COUNT)
+    ]
+
+    start = time.perf_counter()
+    submitter.start()
+    for index, listen in enumerate(listens):
+        submitter.submit(listen, listened_at=index)
+    submitter.stop()
+    wall_time = time.perf_counter() - start
+
+    return {
+        "submission": {
+            "listens_per_second": submitter.stats().submitted_count / wall_time
+        }
+    }
+
+
+def find_regressions(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    regressions = []
+    for name, measures in results.items():
+        for measure, value in measures.items():
+            reference = baseline.get(name, {}).get(measure)
+            if not reference:
+                continue
+
+            change = (value - reference) / reference
+            if measure in HIGHER_IS_BETTER:
+                change = -change
+            if change > tolerance:
+                regressions.append(
+                    f"{name}.{measure}: {value:.4g} "
+                    f"(baseline {reference:.4g}, {change:+.0%} worse)"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help=f"store results in {BASELINE_PATH.name}",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="relative change reported as a regression (default: 0.2)",
+    )
+    args = parser.parse_args()
+
+    results = {**benchmark_import(), **benchmark_submission()}
+    for name, measures in results.items():
+        for measure, value in measures.items():
+            print(f"{name}.{measure}: {value:.4g}")
+
+    if args.save_baseline:
+        BASELINE_PATH.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Baseline saved to {BASELINE_PATH}")
+        return 0
+
+    if not BASELINE_PATH.exists():
+        print("No baseline to compare to, use --save-baseline")
+        return 0
+
+    regressions = find_regressions(
+        results, json.loads(BASELINE_PATH.read_text()), args.tolerance
+    )
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
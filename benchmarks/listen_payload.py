@@ -0,0 +1,60 @@
+"""Micro-benchmark of listen payloads built for a played track.
+
+Compare the CPU cost of the listens built for a track by the frontend
+callbacks (a playing now notification, then a single listen), when
+built from scratch by each callback or prepared once per track.
+
+Run with::
+
+    python benchmarks/listen_payload.py
+
+"""
+
+import timeit
+
+from mopidy.models import Album, Artist, Track
+
+from mopidy_listenbrainz.frontend import _prepare_listen
+from mopidy_listenbrainz.listenbrainz import build_listen
+
+TRACK = Track(
+    uri="local:track:1",
+    name="Track",
+    album=Album(name="Album"),
+    artists=[Artist(name=f"Artist {i}") for i in range(3)],
+    musicbrainz_id="00000000-0000-0000-0000-000000000001",
+)
+NUMBER = 100000
+
+
+def build_from_scratch() -> None:
+    for listened_at in (None, 1):
+        artists = ", ".join(
+            sorted([a.name for a in TRACK.artists if a.name is not None])
+        )
+        build_listen(
+            track=TRACK.name or "",
+            artist=artists,
+            release=TRACK.album.name if TRACK.album else "",
+            musicbrainz_id=str(TRACK.musicbrainz_id),
+            listened_at=listened_at,
+        )
+
+
+def build_prepared() -> None:
+    listen = _prepare_listen(TRACK)
+    listen.build()
+    listen.build(1)
+
+
+def main() -> None:
+    for name, function in (
+        ("from scratch", build_from_scratch),
+        ("prepared", build_prepared),
+    ):
+        seconds = min(timeit.repeat(function, number=NUMBER, repeat=5))
+        print(f"{name}: {seconds / NUMBER * 1e6:.2f} µs per track")
+
+
+if __name__ == "__main__":
+    main()
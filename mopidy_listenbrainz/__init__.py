@@ -31,6 +31,13 @@ class Extension(ext.Extension):
         schema["import_playlists"] = config.Boolean()
         schema["search_schemes"] = config.List(optional=True)
         schema["search_schemes_fallback"] = config.List(optional=True)
+        schema["import_concurrency"] = config.Integer(minimum=1)
+        schema["submission_queue_size"] = config.Integer(minimum=1)
+        schema["playing_now_delay"] = config.Integer(minimum=0)
+        schema["resolve_tracks_on_demand"] = config.Boolean()
+        schema["max_connections"] = config.Integer(minimum=1)
+        schema["max_keepalive_connections"] = config.Integer(minimum=0)
+        schema["keepalive_expiry"] = config.Integer(minimum=0)
         return schema
 
     def setup(self, registry):
@@ -41,3 +48,9 @@ class Extension(ext.Extension):
         from .backend import ListenbrainzBackend
 
         registry.add("backend", ListenbrainzBackend)
+
+        from .web import metrics_app_factory
+
+        registry.add(
+            "http:app", {"name": "listenbrainz", "factory": metrics_app_factory}
+        )
@@ -7,6 +7,9 @@ import pykka
 from mopidy import backend
 from mopidy.types import UriScheme
 
+from . import Extension
+from .library import ListenbrainzLibraryProvider
+from .playback import ListenbrainzPlaybackProvider
 from .playlists import ListenbrainzPlaylistsProvider
 
 if TYPE_CHECKING:
@@ -19,8 +22,18 @@ class ListenbrainzBackend(pykka.ThreadingActor, backend.Backend):
 
     def __init__(
         self,
-        config: Config,  # noqa: ARG002
-        audio: AudioProxy,  # noqa: ARG002
+        config: Config,
+        audio: AudioProxy,
     ) -> None:
         super().__init__()
-        self.playlists = ListenbrainzPlaylistsProvider(self)
+        data_dir = Extension.get_data_dir(config)  # type: ignore
+        self.library = ListenbrainzLibraryProvider(
+            self,
+            search_schemes=config["listenbrainz"].get(  # type: ignore
+                "search_schemes", ["local:"]
+            ),
+        )
+        self.playback = ListenbrainzPlaybackProvider(audio, self)
+        self.playlists = ListenbrainzPlaylistsProvider(
+            self, snapshot_path=data_dir / "playlists.json"
+        )
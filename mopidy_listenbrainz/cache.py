@@ -0,0 +1,183 @@
+import logging
+import pathlib
+import sqlite3
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+POSITIVE_TTL = 30 * 24 * 3600  # seconds
+NEGATIVE_TTL = 3 * 24 * 3600  # seconds
+UNUSED_RESPONSE_TTL = 30 * 24 * 3600  # seconds
+
+
+class TrackCache(object):
+    """Persistent cache of track resolutions.
+
+    A track resolution maps a MusicBrainz recording identifier to the
+    URI of a track found in Mopidy's library (positive entry), or to
+    None when no track was found (negative entry). Negative entries
+    expire sooner than positive entries, so that tracks added to the
+    library are eventually found.
+
+    Entries are stored in a SQLite database. Expired entries are
+    ignored and removed by ``prune()``.
+
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        positive_ttl: float = POSITIVE_TTL,
+        negative_ttl: float = NEGATIVE_TTL,
+    ) -> None:
+        self.path = path
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self._lock = Lock()
+        self._connection = sqlite3.connect(
+            str(path), isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS tracks ("
+            "mbid TEXT PRIMARY KEY, "
+            "uri TEXT, "
+            "expires_at REAL NOT NULL)"
+        )
+
+    def get_many(self, mbids: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Return the cached resolutions of the given identifiers.
+
+        Identifiers without a valid entry are missing from the returned
+        dictionary, whose values are None for negative entries."""
+        now = time.time()
+        found: Dict[str, Optional[str]] = {}
+        with self._lock:
+            for mbid in set(mbids):
+                row = self._connection.execute(
+                    "SELECT uri FROM tracks WHERE mbid = ? AND expires_at > ?",
+                    (mbid, now),
+                ).fetchone()
+                if row is not None:
+                    found[mbid] = row[0]
+        return found
+
+    def set_many(self, resolutions: Dict[str, Optional[str]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN")
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO tracks (mbid, uri, expires_at) "
+                "VALUES (?, ?, ?)",
+                [
+                    (mbid, uri, now + self._get_ttl(uri))
+                    for mbid, uri in resolutions.items()
+                ],
+            )
+            self._connection.execute("COMMIT")
+
+    def _get_ttl(self, uri: Optional[str]) -> float:
+        return self.positive_ttl if uri is not None else self.negative_ttl
+
+    def invalidate(self, mbids: Iterable[str]) -> None:
+        with self._lock:
+            self._connection.execute("BEGIN")
+            self._connection.executemany(
+                "DELETE FROM tracks WHERE mbid = ?",
+                [(mbid,) for mbid in mbids],
+            )
+            self._connection.execute("COMMIT")
+
+    def prune(self) -> None:
+        """Remove expired entries."""
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM tracks WHERE expires_at <= ?", (time.time(),)
+            )
+        logger.debug(f"Pruned {cursor.rowcount} expired track resolutions")
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+@dataclass
+class CachedResponse:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body: bytes
+
+
+class ResponseCache(object):
+    """Persistent cache of HTTP responses, for conditional requests.
+
+    Response bodies are stored with their validators (``ETag`` and
+    ``Last-Modified`` headers) by request path. Entries that haven't
+    been used for ``unused_ttl`` seconds are removed by ``prune()``.
+
+    """
+
+    def __init__(
+        self, path: pathlib.Path, unused_ttl: float = UNUSED_RESPONSE_TTL
+    ) -> None:
+        self.path = path
+        self.unused_ttl = unused_ttl
+        self._lock = Lock()
+        self._connection = sqlite3.connect(
+            str(path), isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "path TEXT PRIMARY KEY, "
+            "etag TEXT, "
+            "last_modified TEXT, "
+            "body BLOB NOT NULL, "
+            "accessed_at REAL NOT NULL)"
+        )
+
+    def get(self, path: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT etag, last_modified, body FROM responses "
+                "WHERE path = ?",
+                (path,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            self._connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE path = ?",
+                (time.time(), path),
+            )
+        etag, last_modified, body = row
+        return CachedResponse(etag, last_modified, body)
+
+    def set(self, path: str, response: CachedResponse) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(path, etag, last_modified, body, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    path,
+                    response.etag,
+                    response.last_modified,
+                    response.body,
+                    time.time(),
+                ),
+            )
+
+    def prune(self) -> None:
+        """Remove entries unused for too long."""
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM responses WHERE accessed_at <= ?",
+                (time.time() - self.unused_ttl,),
+            )
+        logger.debug(f"Pruned {cursor.rowcount} unused cached responses")
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -1,43 +1,162 @@
 import logging
 import time
 from datetime import datetime, timedelta
-from threading import Timer
-from typing import List, Tuple
+from threading import Event, Lock, Thread, Timer
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
+import httpx
 import musicbrainzngs
 import pykka
 from mopidy.core import CoreListener
-from mopidy.models import Playlist, Track
+from mopidy.models import Playlist, Ref, SearchResult, Track
 from mopidy.types import Uri
 
-from . import __dist_name__, __version__, __author_contact__
-from .listenbrainz import Listenbrainz, PlaylistData
+from . import Extension, __dist_name__, __version__, __author_contact__
+from . import metrics
+from .backend import ListenbrainzBackend
+from .cache import ResponseCache, TrackCache
+from .index import TrackIndex
+from .library import get_recording_track
+from .listenbrainz import (
+    HTTP_LIMITS,
+    Listenbrainz,
+    PlaylistData,
+    PlaylistSummary,
+    PreparedListen,
+    TrackMetadata,
+    _RequestError,
+)
+from .musicbrainz import MusicBrainzClient
+from .spool import ListenSpool
+from .submission import ListenSubmitter
 
 logger = logging.getLogger(__name__)
 
+SUBMITTER_STOP_TIMEOUT = 5  # seconds
+VALIDATION_MIN_DELAY = 5  # seconds
+VALIDATION_MAX_DELAY = 600  # seconds
+IMPORT_RETRY_DELAY = 3600  # seconds
+
+RECOMMENDATION_PLAYLIST_URI_PREFIX = "listenbrainz:playlist:recommendation"
+
+# Library browsing, to index tracks
+BROWSED_REF_TYPES = (Ref.DIRECTORY, Ref.ALBUM, Ref.ARTIST)
+LOOKUP_BATCH_SIZE = 1000
+
+
+def _get_playlist_uri(
+    playlist_data: Union[PlaylistData, PlaylistSummary],
+) -> Uri:
+    return Uri(
+        f"{RECOMMENDATION_PLAYLIST_URI_PREFIX}:{playlist_data.playlist_id}"
+    )
+
+
+def _find_track(results: List[SearchResult], mbid: str) -> Optional[Track]:
+    """Find the track with given MusicBrainz identifier in results.
+
+    When no track has the expected identifier, the first track without
+    identifier is returned, since some backends don't report
+    identifiers; Tracks with other identifiers are loose matches."""
+    for result in results:
+        for track in result.tracks:
+            if str(track.musicbrainz_id) == mbid:
+                return track
+    for result in results:
+        for track in result.tracks:
+            if not track.musicbrainz_id:
+                return track
+    return None
+
+
+def _get_uri(track: Optional[Track]) -> Optional[str]:
+    return track.uri if track is not None else None
+
+
+def _prepare_listen(track: Track) -> PreparedListen:
+    artists = ", ".join(
+        sorted([a.name for a in track.artists if a.name is not None])
+    )
+    album_name = track.album.name if track.album and track.album.name else ""
+    mbid = str(track.musicbrainz_id) if track.musicbrainz_id else ""
+    return PreparedListen(
+        track=track.name or "",
+        artist=artists,
+        release=album_name,
+        musicbrainz_id=mbid,
+    )
+
 
 class ListenbrainzFrontend(pykka.ThreadingActor, CoreListener):
     lb: Listenbrainz
+    submitter: ListenSubmitter
 
     def __init__(self, config, core):
         super().__init__()
         self.config = config
         self.library = core.library
-        self.playlists = core.playlists
         self.playlists_update_timer = None
         self.last_start_time = None
+        # listen of the last started track, with the track URI
+        self.prepared_listen: Optional[Tuple[Optional[Uri], PreparedListen]] = (
+            None
+        )
+        self.playing_now_timer: Optional[Timer] = None
+        self.track_cache: Optional[TrackCache] = None
+        # tracks resolved by the current and last imports, by
+        # MusicBrainz identifier
+        self.resolved_tracks: Dict[str, Track] = {}
+        # MusicBrainz identifiers of imported playlists tracks, by
+        # playlist URI
+        self.playlist_track_mbids: Dict[str, List[str]] = {}
+        # library tracks indexed during an import
+        self._track_index: Optional[TrackIndex] = None
+        self.musicbrainz = MusicBrainzClient()
+        self.token_rejected = False
+        self.stopping = Event()
+        self._startup_lock = Lock()
 
     def on_start(self):
         musicbrainzngs.set_useragent(
             __dist_name__, __version__, __author_contact__
         )
 
+        response_cache = None
+        if self.config["listenbrainz"].get("import_playlists", False):
+            # playlists are fetched with conditional requests
+            response_cache = ResponseCache(
+                Extension.get_cache_dir(self.config) / "responses.sqlite3"
+            )
+            response_cache.prune()
+
         self.lb = Listenbrainz(
             self.config["listenbrainz"]["token"],
             self.config["listenbrainz"]["url"],
             self.config["proxy"],
+            response_cache=response_cache,
+            limits=httpx.Limits(
+                max_connections=self.config["listenbrainz"].get(
+                    "max_connections", HTTP_LIMITS.max_connections
+                ),
+                max_keepalive_connections=self.config["listenbrainz"].get(
+                    "max_keepalive_connections",
+                    HTTP_LIMITS.max_keepalive_connections,
+                ),
+                keepalive_expiry=self.config["listenbrainz"].get(
+                    "keepalive_expiry", HTTP_LIMITS.keepalive_expiry
+                ),
+            ),
         )
-        logger.debug("Listenbrainz token valid!")
+
+        # listens are queued until the token is validated, and spooled
+        # once the queue is full
+        spool_path = Extension.get_data_dir(self.config) / "spool.sqlite3"
+        self.submitter = ListenSubmitter(
+            self.lb,
+            self.config["listenbrainz"].get("submission_queue_size", 1000),
+            spool=ListenSpool(spool_path),
+        )
+        self.submitter.register_metrics(metrics.REGISTRY)
 
         if self.config["listenbrainz"].get("import_playlists", False):
             search_schemes = self.config["listenbrainz"].get(
@@ -55,93 +174,262 @@ class ListenbrainzFrontend(pykka.ThreadingActor, CoreListener):
                 )
                 logger.warning(msg)
 
-            self.import_playlists()
+            cache_dir = Extension.get_cache_dir(self.config)
+            self.track_cache = TrackCache(cache_dir / "tracks.sqlite3")
+            self.track_cache.prune()
+            self.musicbrainz = MusicBrainzClient(
+                cache_dir / "musicbrainz.sqlite3"
+            )
+
+        # token validation and playlists import need network requests,
+        # which mustn't delay Mopidy startup
+        Thread(
+            target=self._complete_startup,
+            name="ListenbrainzStartup",
+            daemon=True,
+        ).start()
 
     def on_stop(self):
+        with self._startup_lock:
+            self.stopping.set()
+
         if self.playlists_update_timer:
             self.playlists_update_timer.cancel()
+        self._cancel_playing_now()
+
+        submitter = getattr(self, "submitter", None)
+        if submitter:
+            # on_start may have failed before the submitter is created
+            submitter.stop(timeout=SUBMITTER_STOP_TIMEOUT)
+
+    def _complete_startup(self) -> None:
+        """Validate the token, then start submissions and imports.
+
+        Validation is retried with an exponential backoff while the
+        ListenBrainz API can't be reached."""
+        delay = VALIDATION_MIN_DELAY
+        while True:
+            try:
+                valid = self.lb.validate_token()
+                break
+            except _RequestError:
+                logger.warning(
+                    f"Failed to validate ListenBrainz token, "
+                    f"retrying in {delay} seconds"
+                )
+                if self.stopping.wait(delay):
+                    return
+                delay = min(2 * delay, VALIDATION_MAX_DELAY)
 
+        if not valid:
+            logger.error(
+                "ListenBrainz token is not valid, listens won't be submitted"
+            )
+            self.token_rejected = True
+            return
+
+        logger.debug("Listenbrainz token valid!")
+        with self._startup_lock:
+            if self.stopping.is_set():
+                return
+            self.submitter.start()
+
+        if self.config["listenbrainz"].get("import_playlists", False):
+            self._run_playlists_import()
+
+    def _run_playlists_import(self) -> None:
+        """Import playlists, then schedule the next import.
+
+        A failed import is retried after ``IMPORT_RETRY_DELAY``."""
+        try:
+            self.import_playlists()
+        except Exception as error:
+            logger.warning(f"Failed to import ListenBrainz playlists: {error}")
+            self._schedule_playlists_import(IMPORT_RETRY_DELAY)
+        else:
+            self._schedule_playlists_import()
+
+    @metrics.instrumented("import_playlists")
     def import_playlists(self) -> None:
+        """Import recommendation playlists created for the user.
+
+        Playlists are listed by pages; Tracks of each page are resolved
+        before the next one is requested. Once all pages are imported,
+        the whole set of recommendation playlists is replaced at once
+        in the backend, playlists no longer recommended being deleted.
+
+        """
         logger.info("Importing ListenBrainz playlists")
 
-        import_count = 0
-        playlist_datas = self.lb.list_playlists_created_for_user()
-        logger.debug(f"Found {len(playlist_datas)} playlists to import")
+        provider = self._get_playlists_provider()
+        if provider is None:
+            raise RuntimeError("ListenBrainz backend isn't running")
 
-        existing_playlists = self.playlists.as_list().get()
-        recommendation_playlist_uri_prefix = (
-            "listenbrainz:playlist:recommendation"
+        existing_playlist_uris = {
+            ref.uri
+            for ref in provider.as_list().get()
+            if ref.uri.startswith(RECOMMENDATION_PLAYLIST_URI_PREFIX)
+        }
+        playlists: List[Playlist] = []
+        import_count = 0
+        pages = self.lb.iter_playlist_summary_pages_created_for_user()
+        try:
+            for summaries in pages:
+                logger.debug(f"Found {len(summaries)} playlists to import")
+                page_playlists, page_import_count = self._import_playlists_page(
+                    provider, summaries, existing_playlist_uris
+                )
+                playlists.extend(page_playlists)
+                import_count += page_import_count
+        finally:
+            self._track_index = None
+
+        # forget tracks of playlists no longer imported
+        imported_uris = {p.uri for p in playlists}
+        self.playlist_track_mbids = {
+            u: m
+            for u, m in self.playlist_track_mbids.items()
+            if u in imported_uris
+        }
+        imported_mbids = {
+            m for mbids in self.playlist_track_mbids.values() for m in mbids
+        }
+        for track_mbid in self.resolved_tracks.keys() - imported_mbids:
+            del self.resolved_tracks[track_mbid]
+
+        provider.replace_recommendations(playlists).get()
+        obsolete_count = len(
+            existing_playlist_uris - {p.uri for p in playlists}
         )
-        filtered_existing_playlists = dict(
+        logger.info(
+            f"Successfully imported ListenBrainz playlists: {import_count} "
+            f"({len(playlists) - import_count} already up to date, "
+            f"{obsolete_count} deleted)"
+        )
+
+    def _import_playlists_page(
+        self,
+        provider: Any,
+        summaries: List[PlaylistSummary],
+        existing_playlist_uris: Set[Uri],
+    ) -> Tuple[List[Playlist], int]:
+        """Build the playlists of a page, if modified since last import.
+
+        Playlists up to date are read from the backend playlists
+        provider. Tracks MusicBrainz identifiers of other playlists are
+        kept in ``playlist_track_mbids``. Return the playlists, and the
+        number of playlists built from ListenBrainz data."""
+        # playlists restored by the backend or imported earlier needn't
+        # be fetched again until modified
+        known_playlists = pykka.get_all(
             [
-                (ref.uri, ref)
-                for ref in existing_playlists
-                if ref.uri.startswith(recommendation_playlist_uri_prefix)
+                provider.lookup(_get_playlist_uri(summary))
+                for summary in summaries
+                if _get_playlist_uri(summary) in existing_playlist_uris
             ]
         )
+        up_to_date_playlists = {
+            p.uri: p
+            for p in known_playlists
+            if p is not None and len(p.tracks) > 0
+        }
+        playlists: List[Playlist] = []
+        outdated_summaries = []
+        for summary in summaries:
+            playlist_uri = _get_playlist_uri(summary)
+            playlist = up_to_date_playlists.get(playlist_uri)
+            if (
+                playlist is not None
+                and playlist.last_modified is not None
+                and summary.last_modified is not None
+                and playlist.last_modified >= summary.last_modified
+            ):
+                logger.debug(f"Playlist up to date {str(playlist_uri)}")
+                playlists.append(playlist)
+            else:
+                outdated_summaries.append(summary)
 
-        for playlist_data in playlist_datas:
-            source = playlist_data.playlist_id
-            playlist_uri = Uri(
-                f"{recommendation_playlist_uri_prefix}:{playlist_data.playlist_id}"
+        outdated_playlist_datas = self.lb.fetch_playlists(
+            outdated_summaries,
+            concurrency=self.config["listenbrainz"].get(
+                "import_concurrency", 4
+            ),
+        )
+        if self.config["listenbrainz"].get("resolve_tracks_on_demand", False):
+            # tracks are resolved by the backend when looked up
+            playlists_tracks = [
+                tuple(
+                    get_recording_track(m, p.track_metadata.get(m))
+                    for m in p.track_mbids
+                )
+                for p in outdated_playlist_datas
+            ]
+        else:
+            playlists_tracks = self._collect_playlist_tracks(
+                outdated_playlist_datas
             )
-            tracks = self._collect_playlist_tracks(playlist_data)
 
+        import_count = 0
+        for playlist_data, tracks in zip(
+            outdated_playlist_datas, playlists_tracks
+        ):
+            playlist_uri = _get_playlist_uri(playlist_data)
+            self.playlist_track_mbids[playlist_uri] = playlist_data.track_mbids
             if len(tracks) == 0:
                 logger.debug(
-                    f"Skipping import of playlist with no known track for {source!r}"
+                    "Skipping import of playlist with no known track for "
+                    f"{playlist_data.playlist_id!r}"
                 )
                 continue
 
-            if playlist_uri in filtered_existing_playlists:
-                filtered_existing_playlists.pop(playlist_uri)
-                # must pop since filtered_existing_playlists will
-                # finally be deleted
-
-                logger.debug(f"Already known playlist {str(playlist_uri)}")
-                # maybe there're new tracks in Mopidy's database...
-            else:
-                query = self.playlists.create(
-                    name=playlist_uri, uri_scheme="listenbrainz"
+            playlists.append(
+                Playlist(
+                    uri=playlist_uri,
+                    name=playlist_data.name,
+                    tracks=tracks,
+                    last_modified=playlist_data.last_modified,
                 )
-                # Hack, hack: The backend uses first parameter as URI,
-                # not name...
-                playlist = query.get()
-                if playlist is None:
-                    logger.warning(f"Failed to create playlist for {source!r}")
-                    continue
-
-                logger.debug(f"Playlist {playlist.uri!r} created")
-
-            complete_playlist = Playlist(
-                uri=playlist_uri,
-                name=playlist_data.name,
-                tracks=tracks,
-                last_modified=playlist_data.last_modified,
             )
-            query = self.playlists.save(complete_playlist)
-            playlist = query.get()
-            if playlist is None:
-                logger.warning(f"Failed to save playlist for {source!r}")
-            else:
-                import_count += 1
-                logger.debug(
-                    f"Playlist saved with {len(playlist.tracks)} tracks {playlist.uri!r}"
-                )
+            import_count += 1
 
-        for playlist in filtered_existing_playlists.values():
-            logger.debug(f"Deletion of obsolete playlist {playlist.uri!r}")
-            self.playlists.delete(playlist.uri)
+        return playlists, import_count
 
-        logger.info(
-            f"Successfully imported ListenBrainz playlists: {import_count}"
-        )
-        self._schedule_playlists_import()
+    def _get_playlists_provider(self) -> Optional[Any]:
+        """Return the playlists provider of the ListenBrainz backend.
+
+        The provider is called directly, so that recommendation
+        playlists are replaced at once (see
+        ``ListenbrainzPlaylistsProvider.replace_recommendations()``)."""
+        actor_refs = pykka.ActorRegistry.get_by_class(ListenbrainzBackend)
+        if len(actor_refs) == 0:
+            return None
+        return actor_refs[0].proxy().playlists
 
+    @metrics.instrumented("resolve_playlist_tracks")
     def _collect_playlist_tracks(
-        self, playlist_data: PlaylistData
-    ) -> Tuple[Track, ...]:
-        tracks: List[Track] = []
+        self, playlist_datas: List[PlaylistData]
+    ) -> List[Tuple[Track, ...]]:
+        """Resolve playlists tracks in Mopidy's library.
+
+        Tracks shared by playlists are resolved once, and tracks
+        resolved earlier in the import or by the previous import are
+        reused. Other track resolutions are read from the track cache;
+        Reused and cached tracks are looked up in the library to check
+        they still exist. Library searches by MusicBrainz identifier
+        are then sent at once for the other tracks; Finally, tracks not
+        found are matched by artist and track names in an index of the
+        library tracks (see ``TrackIndex``). Names are those sent with
+        the playlist tracks, or else retrieved from MusicBrainz.
+
+        Mopidy search queries match tracks having all values given for
+        a field, thus a query is sent for each MusicBrainz identifier;
+        Tracks found are matched to identifiers using their
+        ``musicbrainz_id``, for backends returning loose matches.
+
+        Tracks of each playlist are returned in playlist order,
+        unresolved ones being skipped.
+
+        """
         search_schemes_mbid = self.config["listenbrainz"].get(
             "search_schemes", ["local:"]
         )
@@ -149,77 +437,229 @@ class ListenbrainzFrontend(pykka.ThreadingActor, CoreListener):
             "search_schemes_fallback", ["local:"]
         )
 
-        for track_mbid in playlist_data.track_mbids:
-            # try in the library first by MB id
-            query = self.library.search(
+        track_mbids = list(
+            dict.fromkeys(m for p in playlist_datas for m in p.track_mbids)
+        )
+        remembered_uris: Dict[str, Optional[str]] = {
+            m: self.resolved_tracks[m].uri
+            for m in track_mbids
+            if m in self.resolved_tracks
+        }
+        logger.debug(f"{len(remembered_uris)} tracks resolved by last import")
+        cached_uris = (
+            self.track_cache.get_many(
+                [m for m in track_mbids if m not in remembered_uris]
+            )
+            if self.track_cache
+            else {}
+        )
+
+        # remembered and cached tracks may have been removed from the
+        # library since resolved
+        known_uris = {**remembered_uris, **cached_uris}
+        known_track_uris = [u for u in known_uris.values() if u is not None]
+        if len(known_track_uris) > 0:
+            metrics.LIBRARY_REQUESTS.inc(kind="lookup")
+            looked_up_tracks = self.library.lookup(uris=known_track_uris).get()
+        else:
+            looked_up_tracks = {}
+        found_tracks: Dict[str, Optional[Track]] = {}
+        stale_mbids = []
+        for track_mbid, uri in known_uris.items():
+            if uri is None:
+                found_tracks[track_mbid] = None
+            elif len(looked_up_tracks.get(uri, [])) > 0:
+                found_tracks[track_mbid] = looked_up_tracks[uri][0]
+            else:
+                stale_mbids.append(track_mbid)
+                self.resolved_tracks.pop(track_mbid, None)
+
+        if self.track_cache and len(stale_mbids) > 0:
+            logger.debug(f"Invalidating {len(stale_mbids)} cached tracks")
+            self.track_cache.invalidate(stale_mbids)
+
+        stale_cached_count = sum(1 for m in stale_mbids if m in cached_uris)
+        metrics.TRACK_CACHE_LOOKUPS.inc(
+            len(track_mbids) - len(remembered_uris) - len(cached_uris),
+            result="miss",
+        )
+        metrics.TRACK_CACHE_LOOKUPS.inc(
+            len(cached_uris) - stale_cached_count, result="hit"
+        )
+        metrics.TRACK_CACHE_LOOKUPS.inc(stale_cached_count, result="stale")
+
+        # try in the library by MB id
+        unresolved_mbids = [m for m in track_mbids if m not in found_tracks]
+        queries = [
+            self.library.search(
                 {"musicbrainz_trackid": [track_mbid]}, uris=search_schemes_mbid
             )
-            results = query.get()
+            for track_mbid in unresolved_mbids
+        ]
+        metrics.LIBRARY_REQUESTS.inc(len(queries), kind="search_mbid")
+        for track_mbid, results in zip(
+            unresolved_mbids, pykka.get_all(queries)
+        ):
+            found_tracks[track_mbid] = _find_track(results, track_mbid)
+
+        # read track names from playlists, or else from MB
+        missing_mbids = [m for m in unresolved_mbids if not found_tracks[m]]
+        track_metadata: Dict[str, TrackMetadata] = {}
+        for playlist_data in playlist_datas:
+            for track_mbid, metadata in playlist_data.track_metadata.items():
+                track_metadata.setdefault(track_mbid, metadata)
+        unnamed_mbids = [m for m in missing_mbids if m not in track_metadata]
+        if len(unnamed_mbids) > 0:
+            for track_mbid, mb_recording in self.musicbrainz.get_recordings(
+                unnamed_mbids
+            ).items():
+                track_metadata[track_mbid] = TrackMetadata(
+                    mb_recording.title, mb_recording.artist
+                )
 
-            found_tracks = [t for r in results for t in r.tracks]
-            if len(found_tracks) == 0:
-                # retrieve track information from MB
-                mb_recording_query = musicbrainzngs.get_recording_by_id(
-                    track_mbid, includes=["artists"]
+        names = [
+            (m, track_metadata[m]) for m in missing_mbids if m in track_metadata
+        ]
+        if len(names) > 0:
+            # try again with artist name and track title, matched in
+            # memory since few backends support such queries
+            if self._track_index is None:
+                self._track_index = self._build_track_index(
+                    search_schemes_fallback
+                )
+            track_index = self._track_index
+            for track_mbid, metadata in names:
+                found_tracks[track_mbid] = track_index.find(
+                    metadata.creator, metadata.title, metadata.album
                 )
-                if mb_recording_query and mb_recording_query["recording"]:
-                    mb_recording = mb_recording_query["recording"]
-
-                    # try again with album artist name and track title
-                    artist_name = mb_recording["artist-credit-phrase"]
-                    track_name = mb_recording["title"]
-                    query = self.library.search(
-                        {
-                            # very few backends support artist+track name queries,
-                            # so we use a keyword search, although it will be less precise
-                            "any": [artist_name, track_name]
-                        },
-                        uris=search_schemes_fallback,
-                    )
-                    results = query.get()
-
-            found_tracks = [t for r in results for t in r.tracks]
-            if len(found_tracks) == 0:
-                continue
 
-            tracks.append(found_tracks[0])
-        return tuple(tracks)
+        if self.track_cache:
+            self.track_cache.set_many(
+                {
+                    track_mbid: _get_uri(found_tracks[track_mbid])
+                    for track_mbid in unresolved_mbids
+                }
+            )
 
-    def _schedule_playlists_import(self):
-        now = datetime.now()
-        days_until_next_monday = 7 - now.weekday()
-        timer_interval = timedelta(days=days_until_next_monday).total_seconds()
-        logger.debug(f"Playlist update scheduled in {timer_interval} seconds")
-        self.playlists_update_timer = Timer(
-            timer_interval, self.import_playlists
+        self.resolved_tracks.update(
+            (track_mbid, track)
+            for track_mbid, track in found_tracks.items()
+            if track is not None
         )
+        return [
+            tuple(
+                track
+                for track in (found_tracks[m] for m in p.track_mbids)
+                if track is not None
+            )
+            for p in playlist_datas
+        ]
+
+    @metrics.instrumented("build_track_index")
+    def _build_track_index(self, uri_prefixes: List[str]) -> TrackIndex:
+        """Index library tracks with URIs starting with given prefixes.
+
+        All tracks are indexed when no prefix is given. Tracks are found
+        by browsing the library from the root directories of matching
+        schemes; Directories of a level are browsed at once, then tracks
+        are looked up by batches sent at once.
+
+        """
+
+        def is_indexed(uri: str) -> bool:
+            return len(uri_prefixes) == 0 or any(
+                uri.startswith(prefix) for prefix in uri_prefixes
+            )
+
+        schemes = {prefix.split(":")[0] for prefix in uri_prefixes}
+        directory_uris = [
+            ref.uri
+            for ref in self.library.browse(None).get()
+            if len(schemes) == 0 or ref.uri.split(":")[0] in schemes
+        ]
+        visited_uris = set(directory_uris)
+        track_uris: Dict[str, None] = {}  # ordered set
+        while len(directory_uris) > 0:
+            metrics.LIBRARY_REQUESTS.inc(len(directory_uris), kind="browse")
+            results = pykka.get_all(
+                [self.library.browse(uri) for uri in directory_uris]
+            )
+            directory_uris = []
+            for refs in results:
+                for ref in refs:
+                    if ref.type == Ref.TRACK:
+                        if is_indexed(ref.uri):
+                            track_uris[ref.uri] = None
+                    elif ref.type in BROWSED_REF_TYPES:
+                        if ref.uri not in visited_uris:
+                            visited_uris.add(ref.uri)
+                            directory_uris.append(ref.uri)
+
+        uris = list(track_uris)
+        queries = [
+            self.library.lookup(uris=uris[start : start + LOOKUP_BATCH_SIZE])
+            for start in range(0, len(uris), LOOKUP_BATCH_SIZE)
+        ]
+        metrics.LIBRARY_REQUESTS.inc(len(queries), kind="lookup")
+        track_index = TrackIndex()
+        for looked_up_tracks in pykka.get_all(queries):
+            for tracks in looked_up_tracks.values():
+                if len(tracks) > 0:
+                    track_index.add(tracks[0])
+
+        logger.debug(f"Indexed {len(track_index)} library tracks")
+        return track_index
+
+    def _schedule_playlists_import(self, delay: Optional[float] = None) -> None:
+        """Schedule the next import in ``delay`` seconds, or else next
+        Monday."""
+        if self.stopping.is_set():
+            return
+
+        if delay is None:
+            now = datetime.now()
+            days_until_next_monday = 7 - now.weekday()
+            delay = timedelta(days=days_until_next_monday).total_seconds()
+        logger.debug(f"Playlist update scheduled in {delay} seconds")
+        self.playlists_update_timer = Timer(delay, self._run_playlists_import)
         self.playlists_update_timer.start()
 
     def track_playback_started(self, tl_track):
+        if self.token_rejected:
+            return
+
         track = tl_track.track
-        artists = ", ".join(
-            sorted([a.name for a in track.artists if a.name is not None])
-        )
+        listen = _prepare_listen(track)
+        self.prepared_listen = (track.uri, listen)
         self.last_start_time = int(time.time())
-        logger.debug(f"Now playing track: {artists} - {track.name}")
+        logger.debug(f"Now playing track: {listen.artist} - {listen.track}")
+
+        # tracks skipped within the delay aren't submitted as playing now
+        self._cancel_playing_now()
+        delay = self.config["listenbrainz"].get("playing_now_delay", 3)
+        if delay > 0:
+            self.playing_now_timer = Timer(
+                delay,
+                self.submitter.submit,
+                args=(listen,),
+                kwargs={"now_playing": True},
+            )
+            self.playing_now_timer.daemon = True
+            self.playing_now_timer.start()
+        else:
+            self.submitter.submit(listen, now_playing=True)
 
-        album_name = (
-            track.album.name if track.album and track.album.name else ""
-        )
-        mbid = str(track.musicbrainz_id) if track.musicbrainz_id else ""
-        self.lb.submit_listen(
-            track=track.name or "",
-            artist=artists,
-            release=album_name,
-            musicbrainz_id=mbid,
-            now_playing=True,
-        )
+    def _cancel_playing_now(self) -> None:
+        if self.playing_now_timer:
+            self.playing_now_timer.cancel()
+            self.playing_now_timer = None
 
     def track_playback_ended(self, tl_track, time_position):
+        if self.token_rejected:
+            return
+
+        self._cancel_playing_now()
         track = tl_track.track
-        artists = ", ".join(
-            sorted([a.name for a in track.artists if a.name is not None])
-        )
         duration = track.length and track.length // 1000 or 0
         time_position = time_position // 1000
         if duration < 30:
@@ -232,15 +672,16 @@ class ListenbrainzFrontend(pykka.ThreadingActor, CoreListener):
             return
         if self.last_start_time is None:
             self.last_start_time = int(time.time()) - duration
-        logger.debug(f"Recording listen of track: {artists} - {track.name}")
 
-        album_name = (
-            track.album.name if track.album and track.album.name else ""
-        )
-        mbid = str(track.musicbrainz_id) if track.musicbrainz_id else ""
-        self.lb.submit_listen(
-            track=track.name or "",
-            artist=artists,
-            release=album_name,
-            musicbrainz_id=mbid,
+        if self.prepared_listen and self.prepared_listen[0] == track.uri:
+            listen = self.prepared_listen[1]
+        else:
+            listen = _prepare_listen(track)
+        if not listen.track or not listen.artist:
+            logger.debug("Won't record listen for partially known track")
+            return
+        logger.debug(
+            f"Recording listen of track: {listen.artist} - {listen.track}"
         )
+
+        self.submitter.submit(listen, listened_at=int(time.time()))
@@ -0,0 +1,139 @@
+import functools
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Set
+
+from mopidy.models import Track
+
+logger = logging.getLogger(__name__)
+
+TITLE_WEIGHT = 0.7
+ARTIST_WEIGHT = 0.3
+MIN_SCORE = 0.6
+MAX_CANDIDATES = 500
+
+
+# Runs of characters other than letters and digits
+_SEPARATORS_RE = re.compile(r"[\W_]+")
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize(text: str) -> str:
+    """Fold case, accents and punctuation of a name, for comparisons."""
+    if not text.isascii():
+        text = "".join(
+            c
+            for c in unicodedata.normalize("NFKD", text)
+            if not unicodedata.combining(c)
+        )
+    return _SEPARATORS_RE.sub(" ", text.casefold()).strip()
+
+
+def _get_artist(track: Track) -> str:
+    return ", ".join(sorted(a.name for a in track.artists if a.name))
+
+
+def _get_similarity(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+class TrackIndex(object):
+    """In-memory index of tracks by normalized title and artist names.
+
+    Candidates are the tracks with the searched normalized title or,
+    when there're none, up to ``MAX_CANDIDATES`` tracks sharing the
+    least common tokens of the searched title. They're ranked by a
+    similarity score of their title and artist names, ties being broken
+    by album name.
+
+    """
+
+    def __init__(self) -> None:
+        self.tracks: List[Track] = []
+        self._titles: List[str] = []
+        self._artists: List[str] = []
+        self._albums: List[str] = []
+        self._by_title: Dict[str, List[int]] = defaultdict(list)
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    def add(self, track: Track) -> None:
+        title = normalize(track.name or "")
+        if not title:
+            return
+
+        position = len(self.tracks)
+        self.tracks.append(track)
+        self._titles.append(title)
+        self._artists.append(normalize(_get_artist(track)))
+        album = track.album.name if track.album else None
+        self._albums.append(normalize(album or ""))
+        self._by_title[title].append(position)
+        for token in set(title.split()):
+            self._postings[token].append(position)
+
+    def find(
+        self,
+        artist: str,
+        title: str,
+        album: Optional[str] = None,
+        min_score: float = MIN_SCORE,
+    ) -> Optional[Track]:
+        """Return the track best matching names, if similar enough.
+
+        The score of a track is the weighted similarity of its title
+        and artist names to the given ones, between 0 and 1. Among
+        tracks with the best score, one from the given album is
+        preferred."""
+        title = normalize(title)
+        artist = normalize(artist)
+        album = normalize(album) if album else None
+        best_track = None
+        best_score = 0.0
+        best_album = False
+        for position in self._get_candidates(title):
+            title_score = TITLE_WEIGHT * _get_similarity(
+                title, self._titles[position]
+            )
+            max_score = title_score + ARTIST_WEIGHT
+            if max_score < min_score or max_score < best_score:
+                continue  # can't beat the best track
+
+            score = title_score + ARTIST_WEIGHT * _get_similarity(
+                artist, self._artists[position]
+            )
+            same_album = album is not None and album == self._albums[position]
+            if score > best_score or (
+                score == best_score and same_album and not best_album
+            ):
+                best_track = self.tracks[position]
+                best_score = score
+                best_album = same_album
+
+        return best_track if best_score >= min_score else None
+
+    def _get_candidates(self, title: str) -> List[int]:
+        if title in self._by_title:
+            return self._by_title[title]
+
+        postings = sorted(
+            (
+                self._postings[t]
+                for t in set(title.split())
+                if t in self._postings
+            ),
+            key=len,
+        )
+        candidates: Set[int] = set()
+        for positions in postings:
+            if len(candidates) >= MAX_CANDIDATES:
+                break
+            candidates.update(positions[: MAX_CANDIDATES - len(candidates)])
+        return sorted(candidates)
@@ -0,0 +1,162 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple, cast
+
+import pykka
+from mopidy.backend import Backend, BackendProxy, LibraryProvider
+from mopidy.models import Album, Artist, Track
+from mopidy.types import Uri
+
+from . import metrics
+from .listenbrainz import TrackMetadata
+
+logger = logging.getLogger(__name__)
+
+RECORDING_URI_PREFIX = "listenbrainz:recording:"
+
+
+def get_recording_uri(track_mbid: str) -> Uri:
+    return Uri(RECORDING_URI_PREFIX + track_mbid)
+
+
+def get_recording_track(
+    track_mbid: str, metadata: Optional[TrackMetadata] = None
+) -> Track:
+    """Build a placeholder track for a MusicBrainz recording.
+
+    Its URI is resolved to a library track on demand by
+    ``ListenbrainzLibraryProvider``."""
+    fields: Dict[str, Any] = {
+        "uri": get_recording_uri(track_mbid),
+        "musicbrainz_id": track_mbid,
+    }
+    if metadata is not None:
+        fields.update(
+            name=metadata.title,
+            artists=frozenset([Artist(name=metadata.creator)]),
+            album=Album(name=metadata.album) if metadata.album else None,
+        )
+    try:
+        return Track(**fields)
+    except ValueError:  # not a valid MBID
+        del fields["musicbrainz_id"]
+        return Track(**fields)
+
+
+def get_backends(
+    backend: Backend, uri_prefixes: List[str], playback: bool = False
+) -> List[Tuple[BackendProxy, Optional[List[Uri]]]]:
+    """List backends other than ``backend`` with library or playback.
+
+    Only backends handling URIs with given prefixes are listed, with
+    these prefixes, unless no prefix is given."""
+    backends = []
+    for actor_ref in pykka.ActorRegistry.get_all():
+        if not issubclass(actor_ref.actor_class, Backend):
+            continue
+        if actor_ref is getattr(backend, "actor_ref", None):
+            continue
+
+        proxy = cast(BackendProxy, actor_ref.proxy())
+        if playback and not proxy.has_playback().get():
+            continue
+        if not playback and not proxy.has_library().get():
+            continue
+
+        if len(uri_prefixes) == 0:
+            backends.append((proxy, None))
+            continue
+
+        uri_schemes = proxy.uri_schemes.get()
+        uris = [
+            Uri(prefix)
+            for prefix in uri_prefixes
+            if prefix.split(":")[0] in uri_schemes
+        ]
+        if len(uris) > 0:
+            backends.append((proxy, uris))
+    return backends
+
+
+class ListenbrainzLibraryProvider(LibraryProvider):
+    """Provider resolving ``listenbrainz:recording:<mbid>`` URIs.
+
+    Recordings are resolved by searching their MusicBrainz identifier
+    in the libraries of other backends, limited to ``search_schemes``
+    when not empty. Backends are queried directly, since searching
+    through Mopidy's core while it waits for this provider would
+    deadlock.
+
+    Resolutions, including recordings not found, are memoized until
+    the library is refreshed.
+
+    """
+
+    def __init__(self, backend: Backend, search_schemes: List[str]) -> None:
+        super().__init__(backend)
+        self.search_schemes = search_schemes
+        self._resolved_tracks: Dict[str, Optional[Track]] = {}
+
+    def lookup_many(self, uris: Iterable[Uri]) -> Dict[Uri, List[Track]]:
+        uris = list(uris)
+        track_mbids = {
+            uri: uri[len(RECORDING_URI_PREFIX) :]
+            for uri in uris
+            if uri.startswith(RECORDING_URI_PREFIX)
+        }
+        self._resolve(
+            [m for m in track_mbids.values() if m not in self._resolved_tracks]
+        )
+        result: Dict[Uri, List[Track]] = {}
+        for uri in uris:
+            track = self._resolved_tracks.get(track_mbids.get(uri, ""))
+            result[uri] = [track] if track is not None else []
+        return result
+
+    def refresh(self, uri: Optional[Uri] = None) -> None:
+        self._resolved_tracks.clear()
+
+    def resolve(self, uri: Uri) -> Optional[Track]:
+        """Return the library track of a recording URI, if found."""
+        tracks = self.lookup_many([uri]).get(uri, [])
+        return tracks[0] if len(tracks) > 0 else None
+
+    def _resolve(self, track_mbids: List[str]) -> None:
+        if len(track_mbids) == 0:
+            return
+
+        backends = get_backends(self.backend, self.search_schemes)
+        queries = [
+            (
+                track_mbid,
+                backend.library.search(
+                    query={"musicbrainz_trackid": [track_mbid]},
+                    uris=uris,
+                ),
+            )
+            for track_mbid in track_mbids
+            for backend, uris in backends
+        ]
+        metrics.LIBRARY_REQUESTS.inc(len(queries), kind="search_recording")
+        for track_mbid in track_mbids:
+            self._resolved_tracks[track_mbid] = None
+        for track_mbid, query in queries:
+            if self._resolved_tracks[track_mbid] is not None:
+                continue
+
+            try:
+                result = query.get()
+            except Exception as error:
+                logger.debug(
+                    f"Failed to search recording {track_mbid}: {error}"
+                )
+                continue
+
+            for track in result.tracks if result is not None else []:
+                if str(track.musicbrainz_id) == track_mbid:
+                    self._resolved_tracks[track_mbid] = track
+                    break
+
+        found_count = sum(
+            1 for m in track_mbids if self._resolved_tracks[m] is not None
+        )
+        logger.debug(f"Resolved {found_count}/{len(track_mbids)} recordings")
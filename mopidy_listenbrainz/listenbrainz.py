@@ -1,9 +1,25 @@
 import datetime
+import json
 import logging
 import time
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from dataclasses import dataclass, field
 from importlib.metadata import distribution
-from typing import Any, Dict, List, Optional, Union
+from importlib.util import find_spec
+from threading import Lock
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 from urllib.parse import urlparse
 
 
@@ -11,7 +27,13 @@ from mopidy import httpclient
 
 import httpx
 
-from . import __version__
+try:
+    import ijson
+except ImportError:  # optional, see the "streaming" extra
+    ijson = None
+
+from . import __version__, metrics
+from .cache import CachedResponse, ResponseCache
 
 logger = logging.getLogger(__name__)
 
@@ -20,10 +42,60 @@ LIST_PLAYLIST_CREATED_FOR_ENDPOINT = "/1/user/{user}/playlists/createdfor"
 PLAYLIST_ENDPOINT = "/1/playlist/{playlist_id}"
 SUBMIT_LISTEN_ENDPOINT = "/1/submit-listens"
 VALIDATE_TOKEN_ENDPOINT = "/1/validate-token"
+PLAYLISTS_PAGE_SIZE = 25  # default "count" of playlist listings
+
+# HTTP connections and timeouts
+HTTP2_AVAILABLE = find_spec("h2") is not None  # see the "http2" extra
+HTTP_LIMITS = httpx.Limits(
+    max_connections=10, max_keepalive_connections=5, keepalive_expiry=30
+)
+DEFAULT_TIMEOUT = httpx.Timeout(10, connect=5)  # seconds
+SUBMISSION_TIMEOUT = httpx.Timeout(5, connect=3)  # seconds, spooled on failure
+PLAYLIST_TIMEOUT = httpx.Timeout(30, connect=5)  # seconds, large bodies
+
+# Listenbrainz API limits on submissions
+MAX_LISTENS_PER_REQUEST = 1000
+MAX_LISTEN_SIZE = 10240  # bytes
+MAX_LISTEN_PAYLOAD_SIZE = MAX_LISTEN_SIZE * MAX_LISTENS_PER_REQUEST
+
+# Listenbrainz API rate limiting
+RATE_LIMIT_REMAINING_HEADER = "X-RateLimit-Remaining"
+RATE_LIMIT_RESET_IN_HEADER = "X-RateLimit-Reset-In"
+RATE_LIMITED_RETRIES = 3
+RATE_LIMIT_DEFAULT_DELAY = 1  # seconds
+RATE_LIMIT_MAX_DELAY = 60  # seconds
 
 # Musicbrainz resources
 MUSICBRAINZ_PLAYLIST_EXTENSION_URL = "https://musicbrainz.org/doc/jspf#playlist"
 
+# Constant part of listens additional info
+ADDITIONAL_INFO = {
+    "media_player": "Mopidy",
+    "submission_client": "Mopidy-Listenbrainz",
+    "submission_client_version": __version__,
+}
+
+# Paths of playlist DTOs in responses, as ijson prefixes
+CREATED_FOR_PLAYLISTS_PREFIX = "playlists.item.playlist"
+PLAYLIST_PREFIX = "playlist"
+LAST_MODIFIED_AT_FIELD = (
+    f"extension.{MUSICBRAINZ_PLAYLIST_EXTENSION_URL}.last_modified_at"
+)
+
+
+@dataclass
+class PlaylistSummary:
+    playlist_identifier: str
+    playlist_id: str
+    last_modified: Optional[int]
+
+
+@dataclass
+class TrackMetadata:
+    title: str
+    creator: str  # artist credit phrase
+    album: Optional[str] = None
+
 
 @dataclass
 class PlaylistData:
@@ -31,6 +103,8 @@ class PlaylistData:
     name: str
     track_mbids: List[str]
     last_modified: int
+    # metadata sent with playlist tracks, by MBID
+    track_metadata: Dict[str, TrackMetadata] = field(default_factory=dict)
 
 
 def playlist_identifier_to_id(playlist_identifier: str) -> Optional[str]:
@@ -53,10 +127,140 @@ def track_identifier_to_mbid(track_identifier: str) -> Optional[str]:
     )
 
 
-def get_http_client(proxy_config, user_agent):
+def get_track_metadata(track_dto: Dict[str, Any]) -> Optional[TrackMetadata]:
+    """Read the metadata of a JSPF track, if it has a title and creator."""
+    title = track_dto.get("title")
+    creator = track_dto.get("creator")
+    if not isinstance(title, str) or not isinstance(creator, str):
+        return None
+    album = track_dto.get("album")
+    return TrackMetadata(
+        title, creator, album if isinstance(album, str) else None
+    )
+
+
+def get_playlist_last_modified(playlist_dto: Dict[str, Any]) -> Optional[int]:
+    """Read the modification time of a JSPF playlist, in seconds.
+
+    The ``last_modified_at`` field of the MusicBrainz extension is
+    preferred to the playlist creation ``date``."""
+    extension = playlist_dto.get("extension", {}).get(
+        MUSICBRAINZ_PLAYLIST_EXTENSION_URL, {}
+    )
+    for date in (extension.get("last_modified_at"), playlist_dto.get("date")):
+        if not isinstance(date, str):
+            continue
+        try:
+            return int(datetime.datetime.fromisoformat(date).timestamp())
+        except ValueError:
+            continue
+    return None
+
+
+def iter_playlist_dtos(
+    chunks: Iterable[bytes], prefix: str
+) -> Iterator[Dict[str, Any]]:
+    """Iterate over playlist DTOs found at ``prefix`` in a JSON response.
+
+    When ijson is available, the response is parsed incrementally and
+    DTOs only hold the fields read by this module: ``identifier``,
+    ``title``, ``date``, the MusicBrainz extension ``last_modified_at``
+    and the ``identifier``, ``title``, ``creator`` and ``album`` of
+    each ``track``. Otherwise the whole response is parsed, and full
+    DTOs are returned."""
+    if ijson is None:
+        yield from _walk(json.loads(b"".join(chunks)), prefix.split("."))
+        return
+
+    events = ijson.sendable_list()
+    parser = ijson.parse_coro(events)
+    dto: Optional[Dict[str, Any]] = None
+    for chunk in chunks:
+        parser.send(chunk)
+        for event in events:
+            dto, done = _read_playlist_event(dto, prefix, *event)
+            if done is not None:
+                yield done
+        del events[:]
+    parser.close()
+
+
+def _walk(value: Any, keys: List[str]) -> Iterator[Any]:
+    if len(keys) == 0:
+        if isinstance(value, dict):
+            yield value
+        return
+
+    key, rest = keys[0], keys[1:]
+    if key == "item":
+        items = value if isinstance(value, list) else []
+    else:
+        items = [value[key]] if isinstance(value, dict) and key in value else []
+    for item in items:
+        yield from _walk(item, rest)
+
+
+def _read_playlist_event(
+    dto: Optional[Dict[str, Any]],
+    prefix: str,
+    path: str,
+    event: str,
+    value: Any,
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Update the playlist DTO being parsed with an ijson event.
+
+    Return the updated DTO, and the complete DTO once parsed."""
+    if path == prefix and event == "start_map":
+        return {"track": []}, None
+    if dto is None:
+        return None, None
+    if path == prefix and event == "end_map":
+        return None, dto
+
+    field = path[len(prefix) + 1 :] if path.startswith(f"{prefix}.") else None
+    if field == "track.item" and event == "start_map":
+        dto["track"].append({"identifier": []})
+    elif event != "string":
+        pass
+    elif field in ("identifier", "title", "date"):
+        dto[field] = value
+    elif field == LAST_MODIFIED_AT_FIELD:
+        dto["extension"] = {
+            MUSICBRAINZ_PLAYLIST_EXTENSION_URL: {"last_modified_at": value}
+        }
+    elif field in ("track.item.identifier", "track.item.identifier.item"):
+        if len(dto["track"]) > 0:
+            dto["track"][-1]["identifier"].append(value)
+    elif field in (
+        "track.item.title",
+        "track.item.creator",
+        "track.item.album",
+    ):
+        if len(dto["track"]) > 0:
+            dto["track"][-1][field[len("track.item.") :]] = value
+    return dto, None
+
+
+def get_http_client(
+    proxy_config,
+    user_agent,
+    transport: Optional[httpx.BaseTransport] = None,
+    limits: httpx.Limits = HTTP_LIMITS,
+):
+    """Build the HTTP client shared by all requests.
+
+    HTTP/2 is used when the h2 package is installed, so that concurrent
+    requests share one connection. When a transport is given, the
+    proxy configuration is ignored."""
     full_user_agent = httpclient.format_user_agent(user_agent)
     client = httpx.Client(
-        proxy=httpclient.format_proxy(proxy_config),
+        proxy=(
+            httpclient.format_proxy(proxy_config) if transport is None else None
+        ),
+        transport=transport,
+        http2=HTTP2_AVAILABLE,
+        limits=limits,
+        timeout=DEFAULT_TIMEOUT,
         headers={
             "user-agent": full_user_agent,
         },
@@ -64,15 +268,104 @@ def get_http_client(proxy_config, user_agent):
     return client
 
 
+class RateLimiter(object):
+    """Pace requests according to ListenBrainz rate limit headers.
+
+    ListenBrainz advertises in each response the number of requests
+    remaining in the current window and the number of seconds before
+    that window is reset. The limiter counts down remaining requests
+    as they're sent, and ``acquire()`` sleeps until the window is reset
+    once they're exhausted.
+
+    The limiter is shared by all threads sending requests.
+
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._remaining: Optional[int] = None  # unknown
+        self._reset_time = 0.0
+
+    def acquire(self) -> None:
+        """Wait until a request can be sent without being throttled."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._reset_time:
+                    self._remaining = None
+                if self._remaining is None or self._remaining > 0:
+                    if self._remaining is not None:
+                        self._remaining -= 1
+                    return
+                delay = self._reset_time - now
+
+            logger.debug(f"Rate limit reached, waiting {delay:.1f} seconds")
+            time.sleep(delay)
+
+    def update(self, response: httpx.Response, attempt: int = 0) -> None:
+        """Update the limiter state from response headers.
+
+        For a response with status code 429, the limiter is blocked
+        until the advertised reset time, or an exponential delay based
+        on ``attempt`` when the response doesn't advertise one."""
+        remaining = _parse_header(response, RATE_LIMIT_REMAINING_HEADER)
+        reset_in = _parse_header(response, RATE_LIMIT_RESET_IN_HEADER)
+        if response.status_code == 429:
+            remaining = 0
+            if reset_in is None:
+                reset_in = RATE_LIMIT_DEFAULT_DELAY * 2**attempt
+
+        if remaining is None or reset_in is None:
+            return
+
+        with self._lock:
+            self._remaining = remaining
+            self._reset_time = time.monotonic() + min(
+                reset_in, RATE_LIMIT_MAX_DELAY
+            )
+
+
+def _parse_header(response: httpx.Response, name: str) -> Optional[int]:
+    try:
+        return max(0, int(response.headers[name]))
+    except (KeyError, ValueError):
+        return None
+
+
 class _RequestError(Exception):
-    pass
+    """Failed request to ListenBrainz API.
+
+    The status code is None when no response was received."""
+
+    def __init__(self, status_code: Optional[int] = None) -> None:
+        super().__init__(status_code)
+        self.status_code = status_code
+
+    @property
+    def retryable(self) -> bool:
+        return (
+            self.status_code is None
+            or self.status_code == 429
+            or self.status_code >= 500
+        )
+
+    @property
+    def rejected(self) -> bool:
+        """Whether submitted listens were rejected, not the request."""
+        return self.status_code in (400, 413)
 
 
 def check_response_status(response: httpx.Response) -> None:
     if response.status_code == 200:
         return
-    elif response.status_code == 400:
-        logger.warning(f"Bad request {response.json()}")
+
+    response.read()  # error bodies are small, even when streamed
+    if response.status_code == 400:
+        try:
+            details = response.json()
+        except ValueError:  # not JSON, e.g. from a proxy
+            details = response.text[:200]
+        logger.warning(f"Bad request {details}")
     elif response.status_code == 401:
         logger.warning("Unauthorized request")
     elif response.status_code == 429:
@@ -80,7 +373,84 @@ def check_response_status(response: httpx.Response) -> None:
     else:
         logger.warning(f"Unhandled status code {response.status_code}")
 
-    raise _RequestError
+    raise _RequestError(response.status_code)
+
+
+class PreparedListen(object):
+    """Listen of a track, prepared once for all its submissions.
+
+    The track metadata of submission payloads is built on creation, and
+    shared by the listens built by ``build()``; It mustn't be modified.
+
+    """
+
+    __slots__ = ("track", "artist", "track_metadata")
+
+    def __init__(
+        self,
+        track: str,
+        artist: str,
+        release: str = "",
+        musicbrainz_id: str = "",
+    ) -> None:
+        self.track = track
+        self.artist = artist
+        additional_info = (
+            {**ADDITIONAL_INFO, "track_mbid": musicbrainz_id}
+            if musicbrainz_id
+            else ADDITIONAL_INFO
+        )
+        self.track_metadata: Dict[str, Any] = {
+            "track_name": track,
+            "artist_name": artist,
+            "release_name": release,
+            "additional_info": additional_info,
+        }
+
+    def build(self, listened_at: Optional[int] = None) -> Dict[str, Any]:
+        """Build the listen as expected in submission payloads.
+
+        The ``listened_at`` field is omitted when ``listened_at`` is None,
+        as expected for playing now notifications."""
+        if listened_at is None:
+            return {"track_metadata": self.track_metadata}
+        return {
+            "track_metadata": self.track_metadata,
+            "listened_at": listened_at,
+        }
+
+
+def build_listen(
+    track: str,
+    artist: str,
+    release: str = "",
+    musicbrainz_id: str = "",
+    listened_at: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Build a listen as expected in submission payloads.
+
+    See ``PreparedListen``, to build many listens of the same track."""
+    return PreparedListen(track, artist, release, musicbrainz_id).build(
+        listened_at
+    )
+
+
+def count_first_batch(listens: Sequence[Dict[str, Any]]) -> int:
+    """Count listens fitting in a single submission request.
+
+    The leading listens of ``listens`` are counted as long as the API
+    limits on the number of listens and on the payload size are
+    respected. At least one listen is counted if ``listens`` isn't
+    empty."""
+    count = 0
+    payload_size = 0
+    for listen in listens[:MAX_LISTENS_PER_REQUEST]:
+        # account for the separator between listens
+        payload_size += len(json.dumps(listen).encode()) + 2
+        if count > 0 and payload_size > MAX_LISTEN_PAYLOAD_SIZE:
+            break
+        count += 1
+    return count
 
 
 class Listenbrainz(object):
@@ -89,32 +459,144 @@ class Listenbrainz(object):
 
     user_name: Optional[str]
 
-    def __init__(self, token: str, url: str, proxy_config: Any) -> None:
+    def __init__(
+        self,
+        token: str,
+        url: str,
+        proxy_config: Any,
+        response_cache: Optional[ResponseCache] = None,
+        transport: Optional[httpx.BaseTransport] = None,
+        limits: httpx.Limits = HTTP_LIMITS,
+    ) -> None:
         self.token = token
         self.url = url
+        self.response_cache = response_cache
 
         self.user_name = None  # initialized during token validation
+        self.rate_limiter = RateLimiter()
 
         dist = distribution("Mopidy-Listenbrainz")
         self.client = get_http_client(
             proxy_config=proxy_config,
             user_agent=f"{dist.name}/{dist.version}",
+            transport=transport,
+            limits=limits,
         )
 
-        if not self.validate_token():
-            raise RuntimeError(f"Token {token} is not valid")
+    def _request(
+        self,
+        method: str,
+        path: str,
+        headers: Optional[Dict[str, str]] = None,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """Send an authenticated request to ListenBrainz API.
+
+        Requests are paced by the rate limiter, and retried after the
+        advertised reset time when throttled anyway. The response of
+        the last attempt is returned; When ``stream`` is true, its body
+        isn't read and the response must be closed by the caller.
+
+        Raise ``_RequestError`` when no response is received."""
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            start = time.monotonic()
+            request = self.client.build_request(
+                method,
+                # hardcode https?
+                url=f"https://{self.url}{path}",
+                headers={
+                    "Authorization": f"Token {self.token}",
+                    **(headers or {}),
+                },
+                **kwargs,
+            )
+            try:
+                response = self.client.send(request, stream=stream)
+            except httpx.TransportError as error:
+                metrics.HTTP_REQUESTS.inc(method=method, status="error")
+                logger.warning(f"Request to {path!r} failed: {error}")
+                raise _RequestError() from error
+
+            metrics.HTTP_REQUEST_SECONDS.observe(
+                time.monotonic() - start, method=method
+            )
+            metrics.HTTP_REQUESTS.inc(
+                method=method, status=str(response.status_code)
+            )
+            if response.status_code == 429:
+                metrics.HTTP_THROTTLED.inc()
+
+            self.rate_limiter.update(response, attempt)
+            if response.status_code != 429 or attempt >= RATE_LIMITED_RETRIES:
+                return response
+
+            response.close()
+            attempt += 1
+            logger.debug(f"Too many requests, retry #{attempt} of {path!r}")
+
+    def _get(
+        self, path: str, timeout: httpx.Timeout = DEFAULT_TIMEOUT
+    ) -> httpx.Response:
+        """Send a GET request, conditional when a response is cached.
+
+        When the response cache holds a response for ``path``, its
+        validators are sent and a "304 Not Modified" response is
+        replaced by the cached response.
+
+        The body of the returned response is only read to be cached,
+        i.e. when it has validators; Otherwise it's streamed, and the
+        response must be closed by the caller."""
+        if self.response_cache is None:
+            return self._request("GET", path, stream=True, timeout=timeout)
+
+        cached = self.response_cache.get(path)
+        headers = {}
+        if cached is not None and cached.etag is not None:
+            headers["If-None-Match"] = cached.etag
+        if cached is not None and cached.last_modified is not None:
+            headers["If-Modified-Since"] = cached.last_modified
+
+        response = self._request(
+            "GET", path, headers=headers, stream=True, timeout=timeout
+        )
+        if cached is not None:
+            metrics.HTTP_CACHE_REVALIDATIONS.inc(
+                result=(
+                    "not_modified"
+                    if response.status_code == 304
+                    else "modified"
+                )
+            )
+        if response.status_code == 304 and cached is not None:
+            logger.debug(f"Using cached response for {path!r}")
+            response.close()
+            return httpx.Response(
+                200, content=cached.body, request=response.request
+            )
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 200 and (etag or last_modified):
+            self.response_cache.set(
+                path, CachedResponse(etag, last_modified, response.read())
+            )
+        return response
 
     def validate_token(self) -> bool:
-        response = self.client.get(
-            url=f"https://{self.url}{VALIDATE_TOKEN_ENDPOINT}",
-            headers={
-                "Authorization": f"Token {self.token}",
-            },
-        )
+        """Check the token validity and retrieve the user name.
+
+        Raise ``_RequestError`` when the validity can't be checked, for
+        example on network errors."""
+        response = self._request("GET", VALIDATE_TOKEN_ENDPOINT)
 
         try:
             check_response_status(response)
-        except _RequestError:
+        except _RequestError as error:
+            if error.retryable:
+                raise
             return False
 
         parsed_response = response.json()
@@ -128,89 +610,185 @@ class Listenbrainz(object):
         release: str = "",
         musicbrainz_id: str = "",
         now_playing: bool = False,
-    ) -> None:
-        if track == "" or artist == "":
-            logger.debug("Won't submit listen for partially known track")
-            return
+        listened_at: Optional[int] = None,
+    ) -> bool:
+        """Submit a listen or a playing now notification.
+
+        See ``send_listen()``."""
+        return self.send_listen(
+            PreparedListen(track, artist, release, musicbrainz_id),
+            now_playing=now_playing,
+            listened_at=listened_at,
+        )
 
-        listen: Dict[str, Any] = {
-            "track_metadata": {
-                "track_name": track,
-                "artist_name": artist,
-                "release_name": release,
-                "additional_info": {
-                    "media_player": "Mopidy",
-                    "submission_client": "Mopidy-Listenbrainz",
-                    "submission_client_version": __version__,
-                },
-            },
-        }
+    def send_listen(
+        self,
+        listen: PreparedListen,
+        now_playing: bool = False,
+        listened_at: Optional[int] = None,
+    ) -> bool:
+        """Submit a prepared listen or a playing now notification.
+
+        The listen timestamp defaults to the current time. Return
+        whether the submission was accepted by ListenBrainz."""
+        if listen.track == "" or listen.artist == "":
+            logger.debug("Won't submit listen for partially known track")
+            return False
 
-        if not now_playing:
-            listen["listened_at"] = int(time.time())
+        if not now_playing and listened_at is None:
+            listened_at = int(time.time())
 
-        if musicbrainz_id:
-            listen["track_metadata"]["additional_info"][
-                "track_mbid"
-            ] = musicbrainz_id
+        try:
+            self.post_listens(
+                "single" if not now_playing else "playing_now",
+                [listen.build(None if now_playing else listened_at)],
+            )
+        except _RequestError:
+            return False
+        return True
 
-        payload = [listen]
+    @metrics.instrumented("submit_listens")
+    def post_listens(
+        self, listen_type: str, payload: List[Dict[str, Any]]
+    ) -> None:
+        """Post listens built by ``build_listen()``.
 
-        response = self.client.post(
-            # hardcode https?
-            url=f"https://{self.url}{SUBMIT_LISTEN_ENDPOINT}",
+        Raise ``_RequestError`` on failure, including when no response
+        is received."""
+        response = self._request(
+            "POST",
+            SUBMIT_LISTEN_ENDPOINT,
             json={
-                "listen_type": "single" if not now_playing else "playing_now",
+                "listen_type": listen_type,
                 "payload": payload,
             },
-            headers={
-                "Authorization": f"Token {self.token}",
-            },
+            timeout=SUBMISSION_TIMEOUT,
         )
-        try:
-            check_response_status(response)
-        except _RequestError:
-            pass
+        check_response_status(response)
 
-    def list_playlists_created_for_user(self) -> List[PlaylistData]:
-        """List all playlist data from the "created for" endpoint.
+    def import_listens(self, listens: Sequence[Dict[str, Any]]) -> int:
+        """Submit many listens built by ``build_listen()`` at once.
+
+        The leading listens fitting in a single request (see
+        ``count_first_batch()``) are submitted with the ``import``
+        listen type. Return the number of listens submitted; Callers
+        are expected to call again with remaining listens.
+
+        Raise ``_RequestError`` on failure."""
+        count = count_first_batch(listens)
+        if count > 0:
+            self.post_listens("import", list(listens[:count]))
+        return count
+
+    def iter_playlist_summary_pages_created_for_user(
+        self, page_size: int = PLAYLISTS_PAGE_SIZE
+    ) -> Iterator[List[PlaylistSummary]]:
+        """Iterate over pages of playlist summaries from the "created
+        for" endpoint.
 
         The "created for" endpoint list recommendation playlists; It
-        is defined in ``LIST_PLAYLIST_CREATED_FOR_ENDPOINT``."""
+        is defined in ``LIST_PLAYLIST_CREATED_FOR_ENDPOINT``. Pages of
+        ``page_size`` playlists are requested with increasing
+        ``offset`` until a page isn't full. Its responses don't include
+        playlist tracks, which are fetched by ``fetch_playlists()``.
+
+        Raise ``_RequestError`` when a page can't be retrieved."""
         if self.user_name is None:
             logger.warning("No playlist created for unknown user!")
-            return []
+            return
 
+        found_playlists: Set[str] = set()
+        offset = 0
+        while True:
+            summaries, playlist_count = self._list_playlist_summaries_page(
+                offset, page_size, found_playlists
+            )
+            if len(summaries) > 0:
+                yield summaries
+            if playlist_count < page_size:
+                return
+            offset += playlist_count
+
+    @metrics.instrumented("list_playlists")
+    def _list_playlist_summaries_page(
+        self, offset: int, count: int, found_playlists: Set[str]
+    ) -> Tuple[List[PlaylistSummary], int]:
+        """Request a page of playlist summaries from the "created for"
+        endpoint.
+
+        Return the summaries of playlists not in ``found_playlists``,
+        which is updated, and the number of playlists in the page."""
         path = LIST_PLAYLIST_CREATED_FOR_ENDPOINT.format(user=self.user_name)
-        response = self.client.get(
-            url=f"https://{self.url}{path}",
-            headers={
-                "Authorization": f"Token {self.token}",
-            },
+        response = self._get(
+            f"{path}?count={count}&offset={offset}", timeout=PLAYLIST_TIMEOUT
         )
-        check_response_status(response)
-
-        parsed_response = response.json()
-        playlists: List[PlaylistData] = []
-        found_playlists: List[str] = []
-        for dto in parsed_response.get("playlists", []):
-            playlist_dto = dto.get("playlist", {})
-            playlist_identifier = playlist_dto.get("identifier")
-
-            if playlist_identifier is None:
-                logger.debug("Skipping playlist without identifier")
-                continue
-
-            if playlist_identifier in found_playlists:
-                logger.warning(f"Duplicated playlist {playlist_identifier!r}")
-                continue
+        with closing(response):
+            check_response_status(response)
 
-            found_playlists.append(playlist_identifier)
+            summaries: List[PlaylistSummary] = []
+            playlist_count = 0
+            try:
+                for playlist_dto in iter_playlist_dtos(
+                    response.iter_bytes(), CREATED_FOR_PLAYLISTS_PREFIX
+                ):
+                    playlist_count += 1
+                    playlist_identifier = playlist_dto.get("identifier")
+
+                    if playlist_identifier is None:
+                        logger.debug("Skipping playlist without identifier")
+                        continue
+
+                    if playlist_identifier in found_playlists:
+                        logger.warning(
+                            f"Duplicated playlist {playlist_identifier!r}"
+                        )
+                        continue
+
+                    found_playlists.add(playlist_identifier)
+                    playlist_id = playlist_identifier_to_id(playlist_identifier)
+                    if playlist_id is None:
+                        logger.warning(
+                            f"Failed to extract playlist id from {playlist_identifier}"
+                        )
+                        continue
+
+                    summaries.append(
+                        PlaylistSummary(
+                            playlist_identifier,
+                            playlist_id,
+                            get_playlist_last_modified(playlist_dto),
+                        )
+                    )
+            except httpx.TransportError as error:
+                logger.warning(f"Failed to read playlists page: {error}")
+                raise _RequestError() from error
+
+        return summaries, playlist_count
+
+    def fetch_playlists(
+        self, summaries: Sequence[PlaylistSummary], concurrency: int = 1
+    ) -> List[PlaylistData]:
+        """Fetch data of the given playlists.
+
+        Up to ``concurrency`` playlists are fetched at the same time,
+        but playlists are returned in the order of summaries; Those
+        that couldn't be fetched are skipped."""
+        with ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="ListenbrainzFetch"
+        ) as executor:
+            playlist_datas = list(
+                executor.map(
+                    self._collect_playlist_data,
+                    [s.playlist_identifier for s in summaries],
+                )
+            )
 
-            playlist_data = self._collect_playlist_data(playlist_identifier)
+        playlists: List[PlaylistData] = []
+        for summary, playlist_data in zip(summaries, playlist_datas):
             if playlist_data is None:
+                metrics.OPERATION_FAILURES.inc(operation="fetch_playlist")
                 logger.warning(
-                    f"Failed to build playlist {playlist_identifier!r}"
+                    f"Failed to build playlist {summary.playlist_identifier!r}"
                 )
                 continue
 
@@ -218,6 +796,7 @@ class Listenbrainz(object):
 
         return playlists
 
+    @metrics.instrumented("fetch_playlist")
     def _collect_playlist_data(
         self, playlist_identifier: str
     ) -> Optional[PlaylistData]:
@@ -233,7 +812,8 @@ class Listenbrainz(object):
         returned.
 
         MusicBrainz track identifiers are extracted from the tracks
-        identifiers found in the DTO ``tracks`` field.
+        identifiers found in the DTO ``tracks`` field, along with the
+        tracks ``title``, ``creator`` and ``album`` when present.
 
         """
         playlist_id = playlist_identifier_to_id(playlist_identifier)
@@ -244,29 +824,32 @@ class Listenbrainz(object):
             return None
 
         path = PLAYLIST_ENDPOINT.format(playlist_id=playlist_id)
-        response = self.client.get(
-            url=f"https://{self.url}{path}",
-            headers={
-                "Authorization": f"Token {self.token}",
-            },
-        )
-        try:
-            check_response_status(response)
-        except _RequestError:
-            return None
-
-        parsed_response = response.json()
-        dto = parsed_response.get("playlist", {})
+        with closing(self._get(path, timeout=PLAYLIST_TIMEOUT)) as response:
+            try:
+                check_response_status(response)
+            except _RequestError:
+                return None
+
+            try:
+                dto = next(
+                    iter_playlist_dtos(response.iter_bytes(), PLAYLIST_PREFIX),
+                    {},
+                )
+            except httpx.TransportError as error:
+                logger.warning(
+                    f"Failed to read playlist {playlist_id!r}: {error}"
+                )
+                return None
         name = dto.get("title")
         if name is None:
             logger.debug(f"Unable to read a name from playlist {playlist_id!r}")
             return None
-        try:
-            creation_date = datetime.datetime.fromisoformat(dto.get("date"))
-        except (ValueError, TypeError):
+        last_modified = get_playlist_last_modified(dto)
+        if last_modified is None:
             logger.warning(f"Failed to parse date for playlist {playlist_id!r}")
             return None
         track_mbids = []
+        track_metadata = {}
         for track_dto in dto.get("track", []):  # not tracks!
             track_identifiers: Union[str, list[str]] = track_dto.get(
                 "identifier", {}
@@ -283,6 +866,9 @@ class Listenbrainz(object):
                     continue
                 else:
                     track_mbids.append(track_mbid)
+                    metadata = get_track_metadata(track_dto)
+                    if metadata is not None:
+                        track_metadata[track_mbid] = metadata
                     break
 
         if len(track_mbids) == 0:
@@ -292,5 +878,5 @@ class Listenbrainz(object):
             return None
 
         return PlaylistData(
-            playlist_id, name, track_mbids, int(creation_date.timestamp())
+            playlist_id, name, track_mbids, last_modified, track_metadata
         )
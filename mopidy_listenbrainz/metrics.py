@@ -0,0 +1,311 @@
+import functools
+import math
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+)  # seconds
+
+LabelValues = Tuple[Tuple[str, str], ...]
+
+
+def _get_label_values(labels: Dict[str, str]) -> LabelValues:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(label_values: LabelValues) -> str:
+    if len(label_values) == 0:
+        return ""
+
+    def escape(value: str) -> str:
+        return (
+            value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        )
+
+    return (
+        "{"
+        + ",".join(f'{name}="{escape(value)}"' for name, value in label_values)
+        + "}"
+    )
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter(object):
+    """Monotonic counter, by label values."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str) -> None:
+        self.name = name
+        self.documentation = documentation
+        self._lock = Lock()
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        label_values = _get_label_values(labels)
+        with self._lock:
+            self._values[label_values] = (
+                self._values.get(label_values, 0) + amount
+            )
+
+    def get(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(_get_label_values(labels), 0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(label_values)} {_format_value(value)}"
+            for label_values, value in values
+        ]
+
+
+class Histogram(object):
+    """Distribution of observed values, by label values.
+
+    Observations are counted in cumulative buckets whose upper bounds
+    are given by ``buckets``, as expected by Prometheus."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._lock = Lock()
+        # bucket counts, observations sum, by label values
+        self._values: Dict[LabelValues, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        label_values = _get_label_values(labels)
+        with self._lock:
+            counts, total = self._values.get(
+                label_values, ([0] * len(self.buckets), 0.0)
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._values[label_values] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of the managed block, in seconds."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def get_count(self, **labels: str) -> int:
+        with self._lock:
+            counts, _ = self._values.get(
+                _get_label_values(labels), ([0] * len(self.buckets), 0.0)
+            )
+        return counts[-1]
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted(
+                (label_values, (list(counts), total))
+                for label_values, (counts, total) in self._values.items()
+            )
+
+        lines = []
+        for label_values, (counts, total) in values:
+            for bound, count in zip(self.buckets, counts):
+                bucket_labels = label_values + (("le", _format_value(bound)),)
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(bucket_labels)} {count}"
+                )
+            labels = _format_labels(label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+
+class CallbackMetric(object):
+    """Metric whose value is read from a function when collected."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        type: str,
+        function: Callable[[], float],
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.type = type
+        self.function = function
+
+    def collect(self) -> List[str]:
+        return [f"{self.name} {_format_value(self.function())}"]
+
+
+Metric = Union[Counter, Histogram, CallbackMetric]
+M = TypeVar("M", Counter, Histogram, CallbackMetric)
+
+
+class Registry(object):
+    """Set of metrics rendered in Prometheus text exposition format.
+
+    Registering a metric with the name of a registered metric replaces
+    it, so that callbacks of restarted components are up to date.
+
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._metrics: Dict[str, Metric] = {}
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._register(Counter(name, documentation))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, buckets))
+
+    def gauge_callback(
+        self, name: str, documentation: str, function: Callable[[], float]
+    ) -> CallbackMetric:
+        return self._register(
+            CallbackMetric(name, documentation, "gauge", function)
+        )
+
+    def counter_callback(
+        self, name: str, documentation: str, function: Callable[[], float]
+    ) -> CallbackMetric:
+        return self._register(
+            CallbackMetric(name, documentation, "counter", function)
+        )
+
+    def _register(self, metric: M) -> M:
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "listenbrainz_http_requests_total",
+    "ListenBrainz API requests, by method and status code",
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "listenbrainz_http_request_seconds",
+    "ListenBrainz API requests latency, by method",
+)
+HTTP_THROTTLED = REGISTRY.counter(
+    "listenbrainz_http_throttled_total",
+    "ListenBrainz API requests throttled by rate limiting",
+)
+HTTP_CACHE_REVALIDATIONS = REGISTRY.counter(
+    "listenbrainz_http_cache_revalidations_total",
+    "Conditional requests for cached responses, by result",
+)
+OPERATION_SECONDS = REGISTRY.histogram(
+    "listenbrainz_operation_seconds",
+    "Duration of listen submissions and playlists import steps, "
+    "by operation",
+)
+OPERATION_FAILURES = REGISTRY.counter(
+    "listenbrainz_operation_failures_total",
+    "Failed listen submissions and playlists import steps, by operation",
+)
+LIBRARY_REQUESTS = REGISTRY.counter(
+    "listenbrainz_library_requests_total",
+    "Mopidy library searches and lookups for playlists import, by kind",
+)
+TRACK_CACHE_LOOKUPS = REGISTRY.counter(
+    "listenbrainz_track_cache_lookups_total",
+    "Track resolutions read from the track cache, by result",
+)
+MUSICBRAINZ_REQUESTS = REGISTRY.counter(
+    "listenbrainz_musicbrainz_requests_total",
+    "MusicBrainz API requests, by kind",
+)
+MUSICBRAINZ_CACHE_LOOKUPS = REGISTRY.counter(
+    "listenbrainz_musicbrainz_cache_lookups_total",
+    "MusicBrainz recordings read from cache, by result",
+)
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def instrumented(operation: str) -> Callable[[F], F]:
+    """Observe durations of calls to the decorated function.
+
+    Durations and calls raising an exception are counted in
+    ``OPERATION_SECONDS`` and ``OPERATION_FAILURES``, by operation."""
+
+    def decorator(function: F) -> F:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.monotonic()
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                OPERATION_FAILURES.inc(operation=operation)
+                raise
+            finally:
+                OPERATION_SECONDS.observe(
+                    time.monotonic() - start, operation=operation
+                )
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
@@ -0,0 +1,207 @@
+import logging
+import pathlib
+import sqlite3
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional
+
+import musicbrainzngs
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Musicbrainz API policy and limits
+MIN_REQUEST_INTERVAL = 1.0  # seconds
+SEARCH_BATCH_SIZE = 50  # below the search limit, keeps URLs short
+
+CACHE_MAX_ENTRIES = 10000
+
+
+@dataclass
+class RecordingData:
+    mbid: str
+    title: str
+    artist: str  # artist credit phrase
+
+
+class MusicBrainzClient(object):
+    """Look up MusicBrainz recordings.
+
+    Recordings are fetched using a search query matching many
+    recording identifiers at once, missing ones being then looked up
+    individually. Requests are spaced by ``MIN_REQUEST_INTERVAL``
+    seconds to respect MusicBrainz policy; The waiting happens outside
+    of any lock and only for requests actually sent.
+
+    Fetched recordings, and identifiers of unknown recordings, are
+    stored in a SQLite cache bounded to ``max_entries`` entries, least
+    recently used entries being evicted first. The cache is kept in
+    memory when no path is given.
+
+    """
+
+    def __init__(
+        self,
+        cache_path: Optional[pathlib.Path] = None,
+        max_entries: int = CACHE_MAX_ENTRIES,
+    ) -> None:
+        self.max_entries = max_entries
+        self._cache_lock = Lock()
+        self._connection = sqlite3.connect(
+            str(cache_path) if cache_path is not None else ":memory:",
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS recordings ("
+            "mbid TEXT PRIMARY KEY, "
+            "title TEXT, "
+            "artist TEXT, "
+            "accessed_at REAL NOT NULL)"
+        )
+        self._request_lock = Lock()
+        self._next_request_time = 0.0
+
+    @metrics.instrumented("musicbrainz_recordings")
+    def get_recordings(self, mbids: Iterable[str]) -> Dict[str, RecordingData]:
+        """Return data of recordings with the given identifiers.
+
+        Unknown recordings, and recordings that couldn't be fetched,
+        are missing from the returned dictionary."""
+        mbids = list(dict.fromkeys(mbids))
+        recordings = self._read_cache(mbids)
+        missing_mbids = [m for m in mbids if m not in recordings]
+        metrics.MUSICBRAINZ_CACHE_LOOKUPS.inc(len(recordings), result="hit")
+        metrics.MUSICBRAINZ_CACHE_LOOKUPS.inc(len(missing_mbids), result="miss")
+        for start in range(0, len(missing_mbids), SEARCH_BATCH_SIZE):
+            batch = missing_mbids[start : start + SEARCH_BATCH_SIZE]
+            try:
+                fetched = self._search_recordings(batch)
+                for mbid in batch:
+                    if mbid not in fetched:
+                        # search index may lag behind the database
+                        fetched[mbid] = self._get_recording(mbid)
+            except musicbrainzngs.WebServiceError as error:
+                logger.warning(
+                    f"Failed to fetch MusicBrainz recordings: {error}"
+                )
+                continue
+
+            self._write_cache(fetched)
+            recordings.update(fetched)
+
+        return {
+            mbid: recording
+            for mbid, recording in recordings.items()
+            if recording is not None
+        }
+
+    def _wait_for_request_slot(self) -> None:
+        with self._request_lock:
+            now = time.monotonic()
+            request_time = max(now, self._next_request_time)
+            self._next_request_time = request_time + MIN_REQUEST_INTERVAL
+
+        if request_time > now:
+            time.sleep(request_time - now)
+
+    def _search_recordings(
+        self, mbids: List[str]
+    ) -> Dict[str, Optional[RecordingData]]:
+        self._wait_for_request_slot()
+        metrics.MUSICBRAINZ_REQUESTS.inc(kind="search")
+        result = musicbrainzngs.search_recordings(
+            query=" OR ".join(f"rid:{mbid}" for mbid in mbids),
+            limit=len(mbids),
+        )
+
+        recordings: Dict[str, Optional[RecordingData]] = {}
+        for recording in result.get("recording-list", []):
+            if recording.get("id") in mbids:
+                recordings[recording["id"]] = _to_recording_data(recording)
+        return recordings
+
+    def _get_recording(self, mbid: str) -> Optional[RecordingData]:
+        """Look up a single recording, None meaning unknown recording."""
+        self._wait_for_request_slot()
+        metrics.MUSICBRAINZ_REQUESTS.inc(kind="lookup")
+        try:
+            result = musicbrainzngs.get_recording_by_id(
+                mbid, includes=["artists"]
+            )
+        except musicbrainzngs.ResponseError as error:
+            logger.debug(f"Unknown MusicBrainz recording {mbid}: {error}")
+            return None
+
+        if not result or not result.get("recording"):
+            return None
+        return _to_recording_data(result["recording"])
+
+    def _read_cache(
+        self, mbids: List[str]
+    ) -> Dict[str, Optional[RecordingData]]:
+        now = time.time()
+        found: Dict[str, Optional[RecordingData]] = {}
+        with self._cache_lock:
+            for mbid in mbids:
+                row = self._connection.execute(
+                    "SELECT title, artist FROM recordings WHERE mbid = ?",
+                    (mbid,),
+                ).fetchone()
+                if row is None:
+                    continue
+
+                title, artist = row
+                found[mbid] = (
+                    RecordingData(mbid, title, artist)
+                    if title is not None
+                    else None
+                )
+            self._connection.execute("BEGIN")
+            self._connection.executemany(
+                "UPDATE recordings SET accessed_at = ? WHERE mbid = ?",
+                [(now, mbid) for mbid in found],
+            )
+            self._connection.execute("COMMIT")
+        return found
+
+    def _write_cache(
+        self, recordings: Dict[str, Optional[RecordingData]]
+    ) -> None:
+        now = time.time()
+        with self._cache_lock:
+            self._connection.execute("BEGIN")
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO recordings "
+                "(mbid, title, artist, accessed_at) VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        mbid,
+                        recording.title if recording else None,
+                        recording.artist if recording else None,
+                        now,
+                    )
+                    for mbid, recording in recordings.items()
+                ],
+            )
+            self._connection.execute(
+                "DELETE FROM recordings WHERE mbid IN ("
+                "SELECT mbid FROM recordings ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._connection.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._cache_lock:
+            self._connection.close()
+
+
+def _to_recording_data(recording: Dict[str, Any]) -> RecordingData:
+    return RecordingData(
+        mbid=recording["id"],
+        title=recording.get("title", ""),
+        artist=recording.get("artist-credit-phrase", ""),
+    )
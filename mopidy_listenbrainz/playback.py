@@ -0,0 +1,36 @@
+import logging
+from typing import Optional, cast
+from urllib.parse import urlparse
+
+from mopidy.backend import PlaybackProvider
+from mopidy.types import Uri
+
+from .library import (
+    RECORDING_URI_PREFIX,
+    ListenbrainzLibraryProvider,
+    get_backends,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ListenbrainzPlaybackProvider(PlaybackProvider):
+    """Provider playing ``listenbrainz:recording:<mbid>`` URIs.
+
+    Recordings are resolved by the backend library provider, and their
+    library track URI translated by the backend handling it."""
+
+    def translate_uri(self, uri: Uri) -> Optional[Uri]:
+        if not uri.startswith(RECORDING_URI_PREFIX):
+            return None
+
+        library = cast(ListenbrainzLibraryProvider, self.backend.library)
+        track = library.resolve(uri)
+        if track is None or track.uri is None:
+            logger.info(f"Recording not found in library: {uri!r}")
+            return None
+
+        scheme = urlparse(track.uri).scheme
+        for backend, _ in get_backends(self.backend, [scheme], playback=True):
+            return backend.playback.translate_uri(track.uri).get()
+        return None
@@ -1,75 +1,104 @@
+import json
 import logging
+import os
+import pathlib
+from collections import OrderedDict
 from typing import cast, List, Optional
 
-from mopidy.backend import Backend, PlaylistsProvider
+from mopidy.backend import Backend, BackendListener, PlaylistsProvider
 from mopidy.models import Playlist, Ref
 from mopidy.types import Uri, UriScheme
 
 logger = logging.getLogger(__name__)
 
+SNAPSHOT_VERSION = 1
+
+
+def _is_updated(found: Playlist, playlist: Playlist) -> bool:
+    """Tell whether a recommendation playlist replaces the found one.
+
+    It does iff it was modified since, or has more tracks, new tracks
+    being available in Mopidy's database."""
+    is_newer = (playlist.last_modified or 0) > (found.last_modified or 0)
+    return is_newer or len(playlist.tracks) > len(found.tracks)
+
 
 class ListenbrainzPlaylistsProvider(PlaylistsProvider):
     """Provider for ListenBrainz playlists.
 
-    Note that this provider doesn't serialize the playlists. They're
-    expected to be created by the frontend on each extension setup.
+    Playlists are expected to be created by the frontend. When a
+    snapshot path is given, playlists are written to that file on each
+    change and restored from it on construction, so that they're
+    available before the frontend imports them again.
 
     This provider handles URIs with scheme ``listenbrainz:playlist``.
 
+    Playlists are indexed by URI, in creation order. The whole set of
+    recommendation playlists can be replaced at once (see
+    ``replace_recommendations()``).
+
     """
 
     uri_prefix: UriScheme
-    playlists: List[Playlist]
+    playlists: "OrderedDict[Uri, Playlist]"
 
-    def __init__(self, backend: Backend) -> None:
+    def __init__(
+        self, backend: Backend, snapshot_path: Optional[pathlib.Path] = None
+    ) -> None:
         super().__init__(backend)
 
         assert len(backend.uri_schemes) == 1
         self.uri_prefix = cast(UriScheme, backend.uri_schemes[0] + ":playlist")
-        self.playlists = []
+        self.playlists = OrderedDict()
+        self._refs: Optional[List[Ref]] = None
+        self.snapshot_path = snapshot_path
+        if self.snapshot_path is not None:
+            self._read_snapshot()
 
     def as_list(self) -> List[Ref]:
-        return [Ref.playlist(uri=p.uri, name=p.name) for p in self.playlists]
+        if self._refs is None:
+            self._refs = [
+                Ref.playlist(uri=p.uri, name=p.name)
+                for p in self.playlists.values()
+            ]
+        return list(self._refs)
 
     def create(self, name: str) -> Optional[Playlist]:
         if not name.startswith(self.uri_prefix):
             return None
         uri = Uri(name)
         playlist = Playlist(uri=uri, name=name)
-        self.playlists.append(playlist)
+        self.playlists[uri] = playlist
+        self._refs = None
+        self._write_snapshot()
         return playlist
 
     def delete(self, uri: Uri) -> bool:
         if not uri.startswith(self.uri_prefix):
             return False
 
-        found = [p for p in self.playlists if p.uri == uri]
-        if len(found) == 0:
+        if self.playlists.pop(uri, None) is None:
             return False
 
-        pos = self.playlists.index(found[0])
-        del self.playlists[pos]
+        self._refs = None
+        self._write_snapshot()
         return True
 
     def get_items(self, uri: Uri) -> Optional[List[Ref]]:
         if not uri.startswith(self.uri_prefix):
             return None
 
-        found = [p for p in self.playlists if p.uri == uri]
-        if len(found) == 0:
+        found = self.playlists.get(uri)
+        if found is None:
             return None
 
-        return [Ref.playlist(uri=p.uri, name=p.name) for p in found]
+        return [Ref.playlist(uri=found.uri, name=found.name)]
 
     def lookup(self, uri: Uri) -> Optional[Playlist]:
         if not uri.startswith(self.uri_prefix):
             return None
 
-        found = [p for p in self.playlists if p.uri == uri]
-        if len(found) == 0:
-            return None
-
-        return found[0]
+        return self.playlists.get(uri)
 
     def refresh(self) -> None:
         pass
@@ -77,21 +106,114 @@ class ListenbrainzPlaylistsProvider(PlaylistsProvider):
     def save(self, playlist: Playlist) -> Optional[Playlist]:
         uri = playlist.uri
 
-        if not uri.startswith(self.uri_prefix):
+        if uri is None or not uri.startswith(self.uri_prefix):
             return None
 
-        found = [p for p in self.playlists if p.uri == uri]
-        if len(found) == 0:
+        found = self.playlists.get(uri)
+        if found is None:
             return None
 
-        if uri.startswith(self.uri_prefix + ":recommendation"):
-            if not (len(playlist.tracks) > len(found[0].tracks)):
-                # return unchanged playlist for recommendations whose
-                # track list isn't increasing, really save iff first
-                # save after creation or new tracks being available in
-                # Mopidy's database
-                return found[0]
-
-        pos = self.playlists.index(found[0])
-        self.playlists[pos] = playlist
-        return self.playlists[pos]
+        if self._is_recommendation(uri) and not _is_updated(found, playlist):
+            return found
+
+        self.playlists[uri] = playlist
+        if playlist.name != found.name:
+            self._refs = None
+        self._write_snapshot()
+        return playlist
+
+    def replace_recommendations(
+        self, playlists: List[Playlist]
+    ) -> List[Playlist]:
+        """Replace all recommendation playlists with the given ones.
+
+        Recommendations not given are deleted, and known ones are only
+        replaced when updated, as by ``save()``. The new set of
+        playlists is swapped in at once, then a single
+        ``playlists_loaded`` event is sent; Nothing is done when the
+        playlists, and their order, are unchanged.
+
+        Return the recommendation playlists in place, in given order;
+        Playlists with other URIs are skipped."""
+        new_playlists: "OrderedDict[Uri, Playlist]" = OrderedDict(
+            (uri, p)
+            for uri, p in self.playlists.items()
+            if not self._is_recommendation(uri)
+        )
+        for playlist in playlists:
+            uri = playlist.uri
+            if uri is None or not self._is_recommendation(uri):
+                logger.debug(f"Skipping foreign playlist {uri!r}")
+                continue
+
+            found = self.playlists.get(uri)
+            if found is not None and not _is_updated(found, playlist):
+                new_playlists[uri] = found
+            else:
+                new_playlists[uri] = playlist
+
+        if new_playlists == self.playlists:
+            logger.debug("Recommendation playlists unchanged")
+        else:
+            self.playlists = new_playlists
+            self._refs = None
+            self._write_snapshot()
+            BackendListener.send("playlists_loaded")
+        return [
+            p
+            for uri, p in new_playlists.items()
+            if self._is_recommendation(uri)
+        ]
+
+    def _is_recommendation(self, uri: str) -> bool:
+        return uri.startswith(self.uri_prefix + ":recommendation")
+
+    def _read_snapshot(self) -> None:
+        assert self.snapshot_path is not None
+
+        try:
+            with self.snapshot_path.open("r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as error:
+            logger.warning(f"Failed to read playlists snapshot: {error}")
+            return
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            logger.info(
+                "Ignoring playlists snapshot of version "
+                f"{snapshot.get('version')!r}, expected {SNAPSHOT_VERSION}"
+            )
+            return
+
+        for dto in snapshot.get("playlists", []):
+            try:
+                playlist = Playlist.model_validate(dto)
+            except ValueError as error:
+                logger.warning(f"Skipping invalid playlist snapshot: {error}")
+                continue
+
+            if playlist.uri is None or not playlist.uri.startswith(
+                self.uri_prefix
+            ):
+                continue
+
+            self.playlists[playlist.uri] = playlist
+
+        logger.info(f"Restored {len(self.playlists)} ListenBrainz playlists")
+
+    def _write_snapshot(self) -> None:
+        if self.snapshot_path is None:
+            return
+
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "playlists": [p.serialize() for p in self.playlists.values()],
+        }
+        temporary_path = self.snapshot_path.with_suffix(".tmp")
+        try:
+            with temporary_path.open("w", encoding="utf-8") as f:
+                json.dump(snapshot, f, separators=(",", ":"))
+            os.replace(temporary_path, self.snapshot_path)
+        except OSError as error:
+            logger.warning(f"Failed to write playlists snapshot: {error}")
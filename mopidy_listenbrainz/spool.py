@@ -0,0 +1,70 @@
+import json
+import logging
+import pathlib
+import sqlite3
+from threading import Lock
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ListenSpool(object):
+    """Persistent queue of listens waiting for submission.
+
+    Listens are stored in a SQLite database so that they survive
+    restarts; Only the listens requested by ``peek()`` are loaded in
+    memory. Listens are returned in insertion order.
+
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self._lock = Lock()
+        self._connection = sqlite3.connect(
+            str(path), isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS listens ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "listen TEXT NOT NULL)"
+        )
+
+        count = len(self)
+        if count > 0:
+            logger.info(f"Found {count} listens waiting for submission")
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM listens"
+            ).fetchone()
+        return count
+
+    def append(self, listen: Dict[str, Any]) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO listens (listen) VALUES (?)",
+                (json.dumps(listen, separators=(",", ":")),),
+            )
+
+    def peek(self, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Return the oldest listens with their identifiers."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, listen FROM listens ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [(listen_id, json.loads(listen)) for listen_id, listen in rows]
+
+    def remove(self, listen_ids: List[int]) -> None:
+        with self._lock:
+            self._connection.execute("BEGIN")
+            self._connection.executemany(
+                "DELETE FROM listens WHERE id = ?",
+                [(listen_id,) for listen_id in listen_ids],
+            )
+            self._connection.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,346 @@
+import functools
+import logging
+import queue
+import time
+from dataclasses import dataclass
+from threading import Event, Lock, Thread
+from typing import Optional
+
+from .listenbrainz import (
+    MAX_LISTENS_PER_REQUEST,
+    Listenbrainz,
+    PreparedListen,
+    _RequestError,
+)
+from .metrics import Registry
+from .spool import ListenSpool
+
+logger = logging.getLogger(__name__)
+
+REPLAY_MIN_DELAY = 10  # seconds
+REPLAY_MAX_DELAY = 600  # seconds
+
+
+@dataclass
+class SubmissionStats:
+    queue_depth: int
+    spool_depth: int
+    submitted_count: int
+    failed_count: int
+    dropped_count: int
+    last_latency: Optional[float]
+    max_latency: Optional[float]
+
+
+@dataclass
+class _QueuedListen:
+    listen: PreparedListen
+    now_playing: bool
+    listened_at: Optional[int]
+    enqueued_at: float
+
+
+class ListenSubmitter(object):
+    """Submit listens to ListenBrainz from a background thread.
+
+    Listens are pushed to a bounded queue by ``submit()``, which never
+    blocks, and a worker thread sends them using the ``Listenbrainz``
+    client. When the queue is full, the listen is dropped, unless the
+    worker isn't running (e.g. until the token is validated) and a
+    spool is given: Queued listens are then moved to the spool.
+
+    When a spool is given, listens whose submission fails for a
+    transient reason (network error, rate limiting, server error) are
+    stored in the spool. Spooled listens are replayed in order using
+    as few ``import`` requests as possible, with an exponential backoff
+    between failed attempts; Meanwhile new listens are appended to the
+    spool to keep submission order. Playing now notifications are never
+    spooled.
+
+    Latencies are measured from the time a listen is queued to the
+    time its submission completes or it is spooled.
+
+    """
+
+    def __init__(
+        self,
+        lb: Listenbrainz,
+        max_queue_size: int,
+        spool: Optional[ListenSpool] = None,
+    ) -> None:
+        self.lb = lb
+        self.spool = spool
+        self._queue: "queue.Queue[Optional[_QueuedListen]]" = queue.Queue(
+            maxsize=max_queue_size
+        )
+        self._thread = Thread(
+            target=self._run, name="ListenbrainzSubmitter", daemon=True
+        )
+        self._stopping = Event()
+        self._start_lock = Lock()
+        self._next_replay_time = 0.0
+        self._replay_delay = REPLAY_MIN_DELAY
+        self._stats_lock = Lock()
+        self._submitted_count = 0
+        self._failed_count = 0
+        self._dropped_count = 0
+        self._last_latency: Optional[float] = None
+        self._max_latency: Optional[float] = None
+
+    def start(self) -> None:
+        with self._start_lock:
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the worker thread once queued listens are handled.
+
+        Spooled listens are kept for next start, but listens still
+        queued after ``timeout`` seconds are lost. When the worker
+        never started, queued listens are moved to the spool."""
+        with self._start_lock:
+            if not self._thread.is_alive():
+                self._spool_queued_listens()
+                return
+
+        self._stopping.set()
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("Listen submission queue still full on stop")
+            return
+        self._thread.join(timeout)
+
+    def submit(
+        self,
+        listen: PreparedListen,
+        now_playing: bool = False,
+        listened_at: Optional[int] = None,
+    ) -> bool:
+        """Queue a listen for submission.
+
+        Arguments are those of ``Listenbrainz.send_listen()``. Return
+        whether the listen was queued."""
+        item = _QueuedListen(listen, now_playing, listened_at, time.monotonic())
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._start_lock:
+                if not self._thread.is_alive() and self.spool is not None:
+                    self._spool_queued_listens()
+                    if self._spool_listen(item):
+                        return True
+            with self._stats_lock:
+                self._dropped_count += 1
+            logger.warning("Listen submission queue full, dropping listen")
+            return False
+        return True
+
+    def stats(self) -> SubmissionStats:
+        spool_depth = len(self.spool) if self.spool is not None else 0
+        with self._stats_lock:
+            return SubmissionStats(
+                queue_depth=self._queue.qsize(),
+                spool_depth=spool_depth,
+                submitted_count=self._submitted_count,
+                failed_count=self._failed_count,
+                dropped_count=self._dropped_count,
+                last_latency=self._last_latency,
+                max_latency=self._max_latency,
+            )
+
+    def register_metrics(self, registry: Registry) -> None:
+        """Expose submission statistics in a metrics registry."""
+        for name, documentation, field in (
+            ("queue_depth", "Listens waiting in the queue", "queue_depth"),
+            ("spool_depth", "Listens waiting in the spool", "spool_depth"),
+        ):
+            registry.gauge_callback(
+                f"listenbrainz_submission_{name}",
+                documentation,
+                functools.partial(self._get_stat, field),
+            )
+        for name, documentation, field in (
+            ("submitted_total", "Submitted listens", "submitted_count"),
+            ("failed_total", "Listens rejected or failed", "failed_count"),
+            ("dropped_total", "Listens dropped, queue full", "dropped_count"),
+        ):
+            registry.counter_callback(
+                f"listenbrainz_submission_{name}",
+                documentation,
+                functools.partial(self._get_stat, field),
+            )
+        registry.gauge_callback(
+            "listenbrainz_submission_max_latency_seconds",
+            "Maximum time from listen queuing to submission",
+            lambda: self._get_stat("max_latency") or 0,
+        )
+
+    def _get_stat(self, field: str) -> float:
+        return getattr(self.stats(), field)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self._get_replay_timeout())
+            except queue.Empty:
+                self._replay_spool()
+                continue
+
+            if item is None:
+                break
+
+            self._handle(item)
+            if self._get_replay_timeout() == 0:
+                self._replay_spool()
+
+        logger.debug(f"Listen submission stopped: {self.stats()}")
+
+    def _get_replay_timeout(self) -> Optional[float]:
+        if self.spool is None or len(self.spool) == 0:
+            return None
+
+        return max(0, self._next_replay_time - time.monotonic())
+
+    def _handle(self, item: _QueuedListen) -> None:
+        submitted: Optional[bool] = None
+        if item.now_playing or self.spool is None:
+            try:
+                submitted = self.lb.send_listen(
+                    item.listen,
+                    now_playing=item.now_playing,
+                    listened_at=item.listened_at,
+                )
+            except Exception as error:
+                logger.warning(f"Failed to submit listen: {error}")
+                submitted = False
+        else:
+            listened_at = item.listened_at
+            if listened_at is None:
+                listened_at = int(time.time())
+            listen = item.listen.build(listened_at)
+            if len(self.spool) == 0:
+                try:
+                    self.lb.post_listens("single", [listen])
+                    submitted = True
+                except _RequestError as error:
+                    if error.rejected:
+                        submitted = False
+                    else:
+                        self._postpone_replay()
+                except Exception as error:
+                    logger.warning(f"Failed to submit listen: {error}")
+                    submitted = False
+
+            if submitted is None:
+                try:
+                    self.spool.append(listen)
+                    logger.info("Listen spooled for later submission")
+                except Exception as error:
+                    logger.warning(f"Failed to spool listen: {error}")
+                    submitted = False
+
+        latency = time.monotonic() - item.enqueued_at
+        with self._stats_lock:
+            if submitted is True:
+                self._submitted_count += 1
+            elif submitted is False:
+                self._failed_count += 1
+            self._last_latency = latency
+            if self._max_latency is None or latency > self._max_latency:
+                self._max_latency = latency
+
+    def _spool_listen(self, item: _QueuedListen) -> bool:
+        """Store a queued listen in the spool, if it can be spooled."""
+        if item.now_playing or self.spool is None:
+            return False
+
+        listened_at = item.listened_at
+        if listened_at is None:
+            # time the listen was queued
+            listened_at = int(time.time() - time.monotonic() + item.enqueued_at)
+        try:
+            self.spool.append(item.listen.build(listened_at))
+        except Exception as error:
+            logger.warning(f"Failed to spool listen: {error}")
+            return False
+        return True
+
+    def _spool_queued_listens(self) -> None:
+        """Move queued listens to the spool, the worker not running.
+
+        Playing now notifications are discarded, and listens are lost
+        when there's no spool."""
+        spooled_count = 0
+        lost_count = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None or item.now_playing:
+                continue
+            if self._spool_listen(item):
+                spooled_count += 1
+            else:
+                lost_count += 1
+
+        if spooled_count > 0:
+            logger.info(
+                f"{spooled_count} queued listens spooled for later submission"
+            )
+        if lost_count > 0:
+            logger.warning(f"Dropping {lost_count} queued listens")
+            with self._stats_lock:
+                self._dropped_count += lost_count
+
+    def _postpone_replay(self) -> None:
+        logger.debug(f"Spooled listens replay in {self._replay_delay} seconds")
+        self._next_replay_time = time.monotonic() + self._replay_delay
+        self._replay_delay = min(2 * self._replay_delay, REPLAY_MAX_DELAY)
+
+    def _replay_spool(self) -> None:
+        try:
+            self._replay_spooled_listens()
+        except Exception as error:
+            logger.warning(f"Failed to replay spooled listens: {error}")
+            with self._stats_lock:
+                self._failed_count += 1
+            self._postpone_replay()
+
+    def _replay_spooled_listens(self) -> None:
+        assert self.spool is not None
+
+        limit = MAX_LISTENS_PER_REQUEST
+        while not self._stopping.is_set():
+            entries = self.spool.peek(limit)
+            if len(entries) == 0:
+                self._replay_delay = REPLAY_MIN_DELAY
+                return
+
+            listen_ids = [listen_id for listen_id, _ in entries]
+            try:
+                count = self.lb.import_listens(
+                    [listen for _, listen in entries]
+                )
+            except _RequestError as error:
+                if not error.rejected:
+                    # e.g. revoked token: keep listens for later
+                    self._postpone_replay()
+                    return
+
+                if limit > 1:
+                    # find rejected listens by replaying one by one
+                    limit = 1
+                    continue
+
+                logger.warning("Dropping spooled listen rejected by server")
+                with self._stats_lock:
+                    self._failed_count += 1
+                count = 1
+                limit = MAX_LISTENS_PER_REQUEST
+            else:
+                logger.debug(f"Submitted {count} spooled listens")
+                with self._stats_lock:
+                    self._submitted_count += count
+
+            self.spool.remove(listen_ids[:count])
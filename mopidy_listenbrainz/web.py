@@ -0,0 +1,17 @@
+import tornado.web
+
+from .metrics import REGISTRY
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    """Serve metrics in Prometheus text exposition format."""
+
+    def get(self) -> None:
+        self.set_header("Content-Type", CONTENT_TYPE)
+        self.write(REGISTRY.render())
+
+
+def metrics_app_factory(config, core):
+    return [(r"/metrics", MetricsHandler)]
@@ -0,0 +1,54 @@
+from mopidy_listenbrainz.cache import CachedResponse, ResponseCache, TrackCache
+
+
+def test_cache_returns_positive_and_negative_entries(tmp_path):
+    cache = TrackCache(tmp_path / "tracks.sqlite3")
+
+    cache.set_many({"mbid-1": "local:track:1", "mbid-2": None})
+
+    assert cache.get_many(["mbid-1", "mbid-2", "mbid-3"]) == {
+        "mbid-1": "local:track:1",
+        "mbid-2": None,
+    }
+
+
+def test_cache_ignores_expired_entries(tmp_path):
+    cache = TrackCache(
+        tmp_path / "tracks.sqlite3", positive_ttl=3600, negative_ttl=-1
+    )
+
+    cache.set_many({"mbid-1": "local:track:1", "mbid-2": None})
+    cache.prune()
+
+    assert cache.get_many(["mbid-1", "mbid-2"]) == {"mbid-1": "local:track:1"}
+
+
+def test_cache_invalidation(tmp_path):
+    path = tmp_path / "tracks.sqlite3"
+    cache = TrackCache(path)
+    cache.set_many({"mbid-1": "local:track:1", "mbid-2": "local:track:2"})
+
+    cache.invalidate(["mbid-1"])
+    cache.close()
+
+    assert TrackCache(path).get_many(["mbid-1", "mbid-2"]) == {
+        "mbid-2": "local:track:2"
+    }
+
+
+def test_response_cache_stores_validators_and_body(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3")
+
+    cache.set("/path", CachedResponse('"etag"', None, b"{}"))
+
+    assert cache.get("/path") == CachedResponse('"etag"', None, b"{}")
+    assert cache.get("/other") is None
+
+
+def test_response_cache_prunes_unused_entries(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3", unused_ttl=-1)
+    cache.set("/path", CachedResponse('"etag"', None, b"{}"))
+
+    cache.prune()
+
+    assert cache.get("/path") is None
@@ -2,6 +2,7 @@ from unittest import mock
 
 from mopidy_listenbrainz import Extension
 from mopidy_listenbrainz import frontend as frontend_lib, backend as backend_lib
+from mopidy_listenbrainz import web as web_lib
 
 
 def test_get_default_config():
@@ -15,6 +16,13 @@ def test_get_default_config():
     assert "url =" in config
     assert "import_playlists = false" in config
     assert "search_schemes = local:" in config
+    assert "import_concurrency = 4" in config
+    assert "submission_queue_size = 1000" in config
+    assert "playing_now_delay = 3" in config
+    assert "resolve_tracks_on_demand = false" in config
+    assert "max_connections = 10" in config
+    assert "max_keepalive_connections = 5" in config
+    assert "keepalive_expiry = 30" in config
 
 
 def test_get_config_schema():
@@ -26,6 +34,13 @@ def test_get_config_schema():
     assert "url" in schema
     assert "import_playlists" in schema
     assert "search_schemes" in schema
+    assert "import_concurrency" in schema
+    assert "submission_queue_size" in schema
+    assert "playing_now_delay" in schema
+    assert "resolve_tracks_on_demand" in schema
+    assert "max_connections" in schema
+    assert "max_keepalive_connections" in schema
+    assert "keepalive_expiry" in schema
 
 
 def test_setup():
@@ -43,3 +58,14 @@ def test_setup():
         "backend",
         backend_lib.ListenbrainzBackend,
     )
+
+    registry.add.assert_any_call(
+        "http:app",
+        {"name": "listenbrainz", "factory": web_lib.metrics_app_factory},
+    )
+
+
+def test_metrics_app_serves_metrics():
+    (rule,) = web_lib.metrics_app_factory({}, mock.Mock())
+
+    assert rule == (r"/metrics", web_lib.MetricsHandler)
@@ -1,8 +1,52 @@
+import time
+from threading import Event
 from unittest import mock
 
+import pykka
 import pytest
+from mopidy.models import Artist, Playlist, Ref, SearchResult, Track
 
 from mopidy_listenbrainz import frontend as frontend_lib
+from mopidy_listenbrainz.cache import TrackCache
+from mopidy_listenbrainz.listenbrainz import (
+    PlaylistData,
+    PlaylistSummary,
+    PreparedListen,
+    TrackMetadata,
+    _RequestError,
+)
+from mopidy_listenbrainz.musicbrainz import RecordingData
+
+
+def future(value):
+    f = pykka.ThreadingFuture()
+    f.set(value)
+    return f
+
+
+class FakeLibrary:
+    """Library whose searches match tracks by MBID, and whose root
+    directory holds all tracks."""
+
+    def __init__(self, tracks):
+        self.tracks = tracks
+        self.queries = []
+
+    def search(self, query, uris=None):
+        self.queries.append(query)
+        (mbid,) = query["musicbrainz_trackid"]
+        found = [t for t in self.tracks if str(t.musicbrainz_id) == mbid]
+        return future([SearchResult(uri="local:search", tracks=found)])
+
+    def browse(self, uri):
+        if uri is None:
+            return future([Ref.directory(uri="local:directory", name="Local")])
+        return future([Ref.track(uri=t.uri, name=t.name) for t in self.tracks])
+
+    def lookup(self, uris):
+        return future(
+            {uri: [t for t in self.tracks if t.uri == uri] for uri in uris}
+        )
 
 
 @pytest.fixture
@@ -12,8 +56,480 @@ def frontend():
             "token": "xsjk",
         }
     }
-    core = mock.sentinel.core
+    core = mock.Mock()
     return frontend_lib.ListenbrainzFrontend(config, core)
 
 
-# TODO
+MBIDS = [
+    "00000000-0000-0000-0000-000000000001",
+    "00000000-0000-0000-0000-000000000002",
+    "00000000-0000-0000-0000-000000000003",
+]
+
+
+def test_collect_playlist_tracks_keeps_playlist_order(frontend):
+    track_1 = Track(uri="local:track:1", name="One", musicbrainz_id=MBIDS[0])
+    track_2 = Track(uri="local:track:2", name="Two")
+    track_3 = Track(uri="local:track:3", name="Three", musicbrainz_id=MBIDS[2])
+    frontend.library = FakeLibrary([track_1, track_2, track_3])
+    frontend.musicbrainz = mock.Mock()
+    frontend.musicbrainz.get_recordings.return_value = {
+        MBIDS[1]: RecordingData(MBIDS[1], "Two", "Artist")
+    }
+    playlist_data = PlaylistData("id", "Playlist", MBIDS, 0)
+
+    tracks = frontend._collect_playlist_tracks([playlist_data])
+
+    assert tracks == [(track_1, track_2, track_3)]
+    frontend.musicbrainz.get_recordings.assert_called_once_with([MBIDS[1]])
+
+
+def test_collect_playlist_tracks_uses_playlist_track_metadata(frontend):
+    track = Track(
+        uri="local:track:1", name="One", artists=[Artist(name="Artist")]
+    )
+    frontend.library = FakeLibrary([track])
+    frontend.musicbrainz = mock.Mock()
+    frontend.musicbrainz.get_recordings.return_value = {}
+    playlist_data = PlaylistData(
+        "id",
+        "Playlist",
+        MBIDS[:2],
+        0,
+        {MBIDS[0]: TrackMetadata("One", "Artist")},
+    )
+
+    assert frontend._collect_playlist_tracks([playlist_data]) == [(track,)]
+    frontend.musicbrainz.get_recordings.assert_called_once_with([MBIDS[1]])
+
+
+def test_collect_playlist_tracks_skips_unknown_tracks(frontend):
+    frontend.library = FakeLibrary([])
+    frontend.musicbrainz = mock.Mock()
+    frontend.musicbrainz.get_recordings.return_value = {}
+    playlist_data = PlaylistData("id", "Playlist", MBIDS, 0)
+
+    assert frontend._collect_playlist_tracks([playlist_data]) == [()]
+
+
+def test_collect_playlist_tracks_uses_track_cache(frontend, tmp_path):
+    track_1 = Track(uri="local:track:1", name="One", musicbrainz_id=MBIDS[0])
+    track_2 = Track(uri="local:track:2", name="Two", musicbrainz_id=MBIDS[1])
+    frontend.library = FakeLibrary([track_1, track_2])
+    frontend.track_cache = TrackCache(tmp_path / "tracks.sqlite3")
+    frontend.musicbrainz = mock.Mock()
+    frontend.musicbrainz.get_recordings.return_value = {}
+    playlist_data = PlaylistData("id", "Playlist", MBIDS, 0)
+    assert frontend._collect_playlist_tracks([playlist_data]) == [
+        (track_1, track_2)
+    ]
+    frontend.library.queries.clear()
+    frontend.musicbrainz.reset_mock()
+
+    tracks = frontend._collect_playlist_tracks([playlist_data])
+
+    assert tracks == [(track_1, track_2)]
+    assert frontend.library.queries == []
+    frontend.musicbrainz.get_recordings.assert_not_called()
+
+
+def test_collect_playlist_tracks_invalidates_removed_tracks(frontend, tmp_path):
+    track_1 = Track(uri="local:track:1", name="One", musicbrainz_id=MBIDS[0])
+    frontend.library = FakeLibrary([track_1])
+    frontend.track_cache = TrackCache(tmp_path / "tracks.sqlite3")
+    frontend.track_cache.set_many({MBIDS[0]: "local:track:old"})
+    playlist_data = PlaylistData("id", "Playlist", MBIDS[:1], 0)
+
+    assert frontend._collect_playlist_tracks([playlist_data]) == [(track_1,)]
+    assert frontend.track_cache.get_many(MBIDS[:1]) == {
+        MBIDS[0]: "local:track:1"
+    }
+
+
+def test_collect_playlist_tracks_resolves_shared_tracks_once(frontend):
+    track_1 = Track(uri="local:track:1", name="One", musicbrainz_id=MBIDS[0])
+    track_2 = Track(uri="local:track:2", name="Two", musicbrainz_id=MBIDS[1])
+    frontend.library = FakeLibrary([track_1, track_2])
+    playlist_datas = [
+        PlaylistData("id1", "Playlist 1", MBIDS[:2], 0),
+        PlaylistData("id2", "Playlist 2", MBIDS[1::-1], 0),
+    ]
+
+    tracks = frontend._collect_playlist_tracks(playlist_datas)
+
+    assert tracks == [(track_1, track_2), (track_2, track_1)]
+    assert len(frontend.library.queries) == 2
+
+
+def test_collect_playlist_tracks_prefers_tracks_with_searched_mbid(frontend):
+    track_1 = Track(uri="local:track:1", name="One", musicbrainz_id=MBIDS[0])
+    track_2 = Track(uri="local:track:2", name="Two", musicbrainz_id=MBIDS[1])
+    frontend.library = mock.Mock()
+    frontend.library.search.return_value = future(
+        [SearchResult(uri="local:search", tracks=[track_2, track_1])]
+    )
+    playlist_data = PlaylistData("id", "Playlist", MBIDS[:1], 0)
+
+    tracks = frontend._collect_playlist_tracks([playlist_data])
+
+    assert tracks == [(track_1,)]
+
+
+def test_collect_playlist_tracks_ignores_tracks_with_other_mbid(frontend):
+    other = Track(uri="local:track:2", name="Two", musicbrainz_id=MBIDS[1])
+    unidentified = Track(uri="local:track:3", name="Three")
+    frontend.library = mock.Mock()
+    frontend.library.search.side_effect = [
+        future([SearchResult(uri="local:search", tracks=[other])]),
+        future(
+            [SearchResult(uri="local:search", tracks=[other, unidentified])]
+        ),
+    ]
+    frontend.musicbrainz = mock.Mock()
+    frontend.musicbrainz.get_recordings.return_value = {}
+    playlist_datas = [
+        PlaylistData("id1", "Playlist 1", MBIDS[:1], 0),
+        PlaylistData("id2", "Playlist 2", MBIDS[2:], 0),
+    ]
+
+    tracks = frontend._collect_playlist_tracks(playlist_datas)
+
+    assert tracks == [(), (unidentified,)]
+    frontend.musicbrainz.get_recordings.assert_called_once_with(MBIDS[:1])
+
+
+@pytest.fixture
+def playlists_provider(frontend, monkeypatch):
+    """Playlists provider of the backend, as called by the frontend."""
+    provider = mock.Mock()
+    provider.as_list.return_value = future([])
+    provider.lookup.return_value = future(None)
+    provider.replace_recommendations.side_effect = future
+    monkeypatch.setattr(frontend, "_get_playlists_provider", lambda: provider)
+    return provider
+
+
+def test_import_playlists_skips_up_to_date_playlists(
+    frontend, playlists_provider
+):
+    uri = "listenbrainz:playlist:recommendation:id"
+    track = Track(uri="local:track:1", name="One", musicbrainz_id=MBIDS[0])
+    playlist = Playlist(
+        uri=uri, name="Playlist", tracks=[track], last_modified=10
+    )
+    frontend.config["listenbrainz"]["import_concurrency"] = 1
+    frontend.lb = mock.Mock()
+    frontend.lb.iter_playlist_summary_pages_created_for_user.return_value = [
+        [PlaylistSummary("https://listenbrainz.org/playlist/id", "id", 10)]
+    ]
+    frontend.lb.fetch_playlists.return_value = []
+    frontend.library = FakeLibrary([track])
+    playlists_provider.as_list.return_value = future(
+        [Ref.playlist(uri=uri, name="Playlist")]
+    )
+    playlists_provider.lookup.return_value = future(playlist)
+
+    frontend.import_playlists()
+
+    frontend.lb.fetch_playlists.assert_called_once_with([], concurrency=1)
+    assert frontend.library.queries == []
+    playlists_provider.replace_recommendations.assert_called_once_with(
+        [playlist]
+    )
+
+
+def test_import_playlists_publishes_recordings_on_demand(
+    frontend, playlists_provider
+):
+    frontend.config["listenbrainz"]["resolve_tracks_on_demand"] = True
+    frontend.lb = mock.Mock()
+    frontend.lb.iter_playlist_summary_pages_created_for_user.return_value = [
+        [PlaylistSummary("https://listenbrainz.org/playlist/id", "id", 10)]
+    ]
+    frontend.lb.fetch_playlists.return_value = [
+        PlaylistData(
+            "id",
+            "Playlist",
+            MBIDS[:2],
+            10,
+            {MBIDS[0]: TrackMetadata("One", "A")},
+        )
+    ]
+    frontend.library = FakeLibrary([])
+
+    frontend.import_playlists()
+
+    assert frontend.library.queries == []
+    ((playlist,),), _ = playlists_provider.replace_recommendations.call_args
+    assert playlist.tracks == (
+        Track(
+            uri=f"listenbrainz:recording:{MBIDS[0]}",
+            name="One",
+            artists=[Artist(name="A")],
+            musicbrainz_id=MBIDS[0],
+        ),
+        Track(
+            uri=f"listenbrainz:recording:{MBIDS[1]}", musicbrainz_id=MBIDS[1]
+        ),
+    )
+
+
+def test_import_playlists_replaces_playlists_once_all_pages_are_imported(
+    frontend, playlists_provider, monkeypatch
+):
+    obsolete_uri = "listenbrainz:playlist:recommendation:old"
+    track = Track(uri="local:track:1", name="One", artists=[Artist(name="A")])
+    frontend.lb = mock.Mock()
+    frontend.lb.iter_playlist_summary_pages_created_for_user.return_value = [
+        [PlaylistSummary(f"https://listenbrainz.org/playlist/{i}", i, 10)]
+        for i in ("1", "2")
+    ]
+    frontend.lb.fetch_playlists.side_effect = lambda summaries, **_: [
+        PlaylistData(
+            s.playlist_id,
+            "Playlist",
+            [MBIDS[int(s.playlist_id)]],
+            10,
+            {MBIDS[int(s.playlist_id)]: TrackMetadata("One", "A")},
+        )
+        for s in summaries
+    ]
+    frontend.library = FakeLibrary([track])
+    frontend.musicbrainz = mock.Mock()
+    playlists_provider.as_list.return_value = future(
+        [Ref.playlist(uri=obsolete_uri, name="Old")]
+    )
+    build_track_index = mock.Mock(wraps=frontend._build_track_index)
+    monkeypatch.setattr(frontend, "_build_track_index", build_track_index)
+
+    frontend.import_playlists()
+
+    assert frontend.lb.fetch_playlists.call_count == 2
+    build_track_index.assert_called_once()
+    (playlists,), _ = playlists_provider.replace_recommendations.call_args
+    assert [(p.uri, p.tracks) for p in playlists] == [
+        ("listenbrainz:playlist:recommendation:1", (track,)),
+        ("listenbrainz:playlist:recommendation:2", (track,)),
+    ]
+
+
+def test_import_playlists_remembers_tracks_of_up_to_date_playlists(
+    frontend, playlists_provider
+):
+    track = Track(uri="local:track:1", name="One", musicbrainz_id=MBIDS[0])
+    frontend.lb = mock.Mock()
+    frontend.lb.iter_playlist_summary_pages_created_for_user.return_value = [
+        [PlaylistSummary("https://listenbrainz.org/playlist/id", "id", 10)]
+    ]
+    frontend.lb.fetch_playlists.side_effect = lambda summaries, **_: [
+        PlaylistData(s.playlist_id, "Playlist", MBIDS[:1], 10)
+        for s in summaries
+    ]
+    frontend.library = FakeLibrary([track])
+    frontend.import_playlists()
+    (playlists,), _ = playlists_provider.replace_recommendations.call_args
+    playlists_provider.as_list.return_value = future(
+        [Ref.playlist(uri=p.uri, name=p.name) for p in playlists]
+    )
+    playlists_provider.lookup.return_value = future(playlists[0])
+
+    frontend.import_playlists()
+
+    frontend.lb.fetch_playlists.assert_called_with([], concurrency=4)
+    assert frontend.resolved_tracks == {MBIDS[0]: track}
+
+
+def test_collect_playlist_tracks_only_resolves_new_tracks(frontend):
+    track_1 = Track(uri="local:track:1", name="One", musicbrainz_id=MBIDS[0])
+    track_2 = Track(uri="local:track:2", name="Two", musicbrainz_id=MBIDS[1])
+    frontend.library = FakeLibrary([track_1, track_2])
+    frontend._collect_playlist_tracks([PlaylistData("id", "P", MBIDS[:1], 0)])
+    frontend.library.queries.clear()
+
+    tracks = frontend._collect_playlist_tracks(
+        [PlaylistData("id", "P", MBIDS[:2], 1)]
+    )
+
+    assert tracks == [(track_1, track_2)]
+    assert frontend.library.queries == [{"musicbrainz_trackid": [MBIDS[1]]}]
+
+
+def test_collect_playlist_tracks_forgets_removed_tracks(frontend):
+    track_1 = Track(uri="local:track:1", name="One", musicbrainz_id=MBIDS[0])
+    frontend.library = FakeLibrary([track_1])
+    frontend.musicbrainz = mock.Mock()
+    frontend.musicbrainz.get_recordings.return_value = {}
+    playlist_data = PlaylistData("id", "P", MBIDS[:1], 0)
+    frontend._collect_playlist_tracks([playlist_data])
+    frontend.library.tracks = []
+    frontend.library.queries.clear()
+
+    tracks = frontend._collect_playlist_tracks([playlist_data])
+
+    assert tracks == [()]
+    assert frontend.library.queries == [{"musicbrainz_trackid": [MBIDS[0]]}]
+    assert frontend.resolved_tracks == {}
+
+
+def test_connection_limits_are_configurable(frontend, monkeypatch, tmp_path):
+    frontend.config["proxy"] = {}
+    frontend.config["listenbrainz"].update(
+        url="api.listenbrainz.org",
+        max_connections=2,
+        max_keepalive_connections=1,
+        keepalive_expiry=5,
+    )
+    listenbrainz = mock.Mock()
+    monkeypatch.setattr(frontend_lib, "Listenbrainz", listenbrainz)
+    monkeypatch.setattr(frontend_lib, "ListenSubmitter", mock.Mock())
+    monkeypatch.setattr(frontend_lib, "Thread", mock.Mock())
+    monkeypatch.setattr(
+        frontend_lib.Extension, "get_data_dir", lambda config: tmp_path
+    )
+
+    frontend.on_start()
+
+    limits = listenbrainz.call_args.kwargs["limits"]
+    assert limits.max_connections == 2
+    assert limits.max_keepalive_connections == 1
+    assert limits.keepalive_expiry == 5
+
+
+def test_startup_validation_is_retried_until_api_is_reachable(
+    frontend, monkeypatch
+):
+    monkeypatch.setattr(frontend_lib, "VALIDATION_MIN_DELAY", 0)
+    frontend.lb = mock.Mock()
+    frontend.lb.validate_token.side_effect = [_RequestError(), True]
+    frontend.submitter = mock.Mock()
+
+    frontend._complete_startup()
+
+    assert frontend.lb.validate_token.call_count == 2
+    frontend.submitter.start.assert_called_once_with()
+
+
+def test_listens_are_ignored_when_token_is_rejected(frontend):
+    frontend.lb = mock.Mock()
+    frontend.lb.validate_token.return_value = False
+    frontend.submitter = mock.Mock()
+
+    frontend._complete_startup()
+    frontend.track_playback_started(
+        mock.Mock(track=Track(uri="local:track:1", name="One"))
+    )
+
+    frontend.submitter.start.assert_not_called()
+    frontend.submitter.submit.assert_not_called()
+
+
+def test_startup_validation_stops_with_frontend(frontend):
+    frontend.lb = mock.Mock()
+    frontend.lb.validate_token.side_effect = _RequestError()
+    frontend.submitter = mock.Mock()
+    frontend.stopping.set()
+
+    frontend._complete_startup()
+
+    assert frontend.lb.validate_token.call_count == 1
+    frontend.submitter.start.assert_not_called()
+
+
+def test_failed_playlists_import_is_retried(frontend, monkeypatch):
+    timer = mock.Mock()
+    monkeypatch.setattr(frontend_lib, "Timer", timer)
+    monkeypatch.setattr(frontend, "_get_playlists_provider", lambda: None)
+
+    frontend._run_playlists_import()
+    frontend.stopping.set()
+    frontend._run_playlists_import()
+
+    timer.assert_called_once_with(
+        frontend_lib.IMPORT_RETRY_DELAY, frontend._run_playlists_import
+    )
+    timer.return_value.start.assert_called_once_with()
+
+
+def test_listen_prepared_on_start_is_submitted_on_end(frontend, monkeypatch):
+    monkeypatch.setattr(frontend_lib, "_prepare_listen", mock.Mock())
+    frontend.config["listenbrainz"]["playing_now_delay"] = 0
+    frontend.submitter = mock.Mock()
+    track = Track(
+        uri="local:track:1",
+        name="One",
+        length=60000,
+        artists=[Artist(name="B"), Artist(name="A")],
+    )
+    frontend_lib._prepare_listen.return_value = PreparedListen("One", "A, B")
+
+    frontend.track_playback_started(mock.Mock(track=track))
+    frontend.track_playback_ended(mock.Mock(track=track), 60000)
+
+    frontend_lib._prepare_listen.assert_called_once_with(track)
+    listens = [c.args[0] for c in frontend.submitter.submit.mock_calls]
+    assert listens == [frontend_lib._prepare_listen.return_value] * 2
+
+
+def test_prepare_listen_joins_sorted_artists():
+    track = Track(
+        uri="local:track:1",
+        name="One",
+        artists=[Artist(name="B"), Artist(name="A")],
+    )
+
+    listen = frontend_lib._prepare_listen(track)
+
+    assert listen.build()["track_metadata"]["artist_name"] == "A, B"
+
+
+def test_playing_now_is_submitted_once_track_stays_current(frontend):
+    frontend.config["listenbrainz"]["playing_now_delay"] = 0.05
+    submitted = Event()
+    frontend.submitter = mock.Mock()
+    frontend.submitter.submit.side_effect = lambda *a, **kw: submitted.set()
+    track = Track(uri="local:track:1", name="One")
+
+    frontend.track_playback_started(mock.Mock(track=track))
+    frontend.submitter.submit.assert_not_called()
+
+    assert submitted.wait(timeout=1)
+    (call,) = frontend.submitter.submit.mock_calls
+    assert call.kwargs == {"now_playing": True}
+
+
+def test_playing_now_is_cancelled_when_track_is_skipped(frontend):
+    frontend.config["listenbrainz"]["playing_now_delay"] = 0.05
+    frontend.submitter = mock.Mock()
+    track_1 = Track(uri="local:track:1", name="One", length=60000)
+    track_2 = Track(uri="local:track:2", name="Two", length=60000)
+
+    frontend.track_playback_started(mock.Mock(track=track_1))
+    frontend.track_playback_ended(mock.Mock(track=track_1), 1000)
+    frontend.track_playback_started(mock.Mock(track=track_2))
+    frontend.on_stop()
+    time.sleep(0.1)
+
+    frontend.submitter.submit.assert_not_called()
+
+
+def test_collect_playlist_tracks_matches_names_in_library_index(frontend):
+    track_1 = Track(
+        uri="local:track:1",
+        name="Café del Mar",
+        artists=[Artist(name="Energy 52")],
+    )
+    track_2 = Track(
+        uri="local:track:2",
+        name="Cafe del Mar (Remix)",
+        artists=[Artist(name="Someone")],
+    )
+    frontend.library = FakeLibrary([track_2, track_1])
+    frontend.musicbrainz = mock.Mock()
+    frontend.musicbrainz.get_recordings.return_value = {
+        MBIDS[0]: RecordingData(MBIDS[0], "CAFE DEL MAR", "Energy 52")
+    }
+    playlist_data = PlaylistData("id", "Playlist", MBIDS[:1], 0)
+
+    tracks = frontend._collect_playlist_tracks([playlist_data])
+
+    assert tracks == [(track_1,)]
@@ -0,0 +1,55 @@
+from mopidy.models import Album, Artist, Track
+
+from mopidy_listenbrainz.index import TrackIndex, normalize
+
+
+def test_normalize_folds_case_accents_and_punctuation():
+    assert normalize("  Beyoncé – Crazy in Love!! ") == "beyonce crazy in love"
+    assert normalize("Ｆｕｌｌ　Ｗｉｄｔｈ") == "full width"
+
+
+def test_find_ranks_candidates_by_similarity():
+    index = TrackIndex()
+    live = Track(
+        uri="local:track:1",
+        name="Hey Jude (Live)",
+        artists=[Artist(name="The Beatles")],
+    )
+    studio = Track(
+        uri="local:track:2",
+        name="Hey Jude",
+        artists=[Artist(name="The Beatles")],
+    )
+    cover = Track(
+        uri="local:track:3", name="Hey Jude", artists=[Artist(name="Other")]
+    )
+    for track in (live, cover, studio):
+        index.add(track)
+
+    assert index.find("the beatles", "hey jude") == studio
+
+
+def test_find_ignores_dissimilar_tracks():
+    index = TrackIndex()
+    index.add(
+        Track(uri="local:track:1", name="Love", artists=[Artist(name="A")])
+    )
+
+    assert index.find("B", "Love Me Tender") is None
+    assert index.find("A", "Unknown") is None
+
+
+def test_find_prefers_tracks_from_album():
+    index = TrackIndex()
+    single = Track(uri="local:track:1", name="Song", artists=[Artist(name="A")])
+    album = Track(
+        uri="local:track:2",
+        name="Song",
+        artists=[Artist(name="A")],
+        album=Album(name="The Album"),
+    )
+    index.add(single)
+    index.add(album)
+
+    assert index.find("A", "Song") == single
+    assert index.find("A", "Song", "the album") == album
@@ -0,0 +1,120 @@
+import pykka
+import pytest
+from mopidy import backend
+from mopidy.models import SearchResult, Track
+
+from mopidy_listenbrainz.library import (
+    ListenbrainzLibraryProvider,
+    get_recording_track,
+    get_recording_uri,
+)
+from mopidy_listenbrainz.playback import ListenbrainzPlaybackProvider
+
+MBIDS = [
+    "00000000-0000-0000-0000-000000000001",
+    "00000000-0000-0000-0000-000000000002",
+]
+TRACK = Track(uri="local:track:1", name="One", musicbrainz_id=MBIDS[0])
+
+
+class FakeLibraryProvider(backend.LibraryProvider):
+    def __init__(self, backend, tracks, queries):
+        super().__init__(backend)
+        self.tracks = tracks
+        self.queries = queries
+
+    def search(self, query, uris=None, exact=False):
+        self.queries.append((query, uris))
+        (mbid,) = query["musicbrainz_trackid"]
+        found = [t for t in self.tracks if str(t.musicbrainz_id) == mbid]
+        return SearchResult(uri="local:search", tracks=found)
+
+
+class FakePlaybackProvider(backend.PlaybackProvider):
+    def translate_uri(self, uri):
+        return f"file:///{uri}"
+
+
+class FakeBackend(pykka.ThreadingActor, backend.Backend):
+    def __init__(self, uri_schemes, tracks, queries):
+        super().__init__()
+        self.uri_schemes = uri_schemes
+        self.library = FakeLibraryProvider(self, tracks, queries)
+        self.playback = FakePlaybackProvider(None, self)
+
+
+class ListenbrainzBackend(pykka.ThreadingActor, backend.Backend):
+    uri_schemes = ["listenbrainz"]
+
+    def __init__(self, search_schemes):
+        super().__init__()
+        self.library = ListenbrainzLibraryProvider(self, search_schemes)
+        self.playback = ListenbrainzPlaybackProvider(None, self)
+
+
+@pytest.fixture
+def queries():
+    """Searches received by other backends, by URI scheme."""
+    queries = {"local": [], "other": []}
+    local = FakeBackend.start(["local"], [TRACK], queries["local"])
+    other = FakeBackend.start(
+        ["other"],
+        [TRACK.model_copy(update={"uri": "other:1"})],
+        queries["other"],
+    )
+    yield queries
+    local.stop()
+    other.stop()
+
+
+@pytest.fixture
+def lb_backend(queries):
+    return ListenbrainzBackend(["local:"])
+
+
+def test_lookup_resolves_recordings_in_searched_backends(queries, lb_backend):
+    uris = [get_recording_uri(m) for m in MBIDS]
+
+    tracks = lb_backend.library.lookup_many(uris)
+
+    assert tracks == {uris[0]: [TRACK], uris[1]: []}
+    assert queries["local"] == [
+        ({"musicbrainz_trackid": [m]}, ["local:"]) for m in MBIDS
+    ]
+    assert queries["other"] == []
+
+
+def test_lookup_memoizes_resolutions_until_refresh(queries, lb_backend):
+    uris = [get_recording_uri(m) for m in MBIDS]
+    lb_backend.library.lookup_many(uris)
+    lb_backend.library.lookup_many(uris)
+
+    assert len(queries["local"]) == 2
+
+    lb_backend.library.refresh()
+    lb_backend.library.lookup_many(uris[:1])
+
+    assert len(queries["local"]) == 3
+
+
+def test_lookup_ignores_foreign_uris(queries, lb_backend):
+    assert lb_backend.library.lookup_many(["local:track:1"]) == {
+        "local:track:1": []
+    }
+    assert queries["local"] == []
+
+
+def test_playback_translates_uri_of_resolved_track(queries, lb_backend):
+    uri = lb_backend.playback.translate_uri(get_recording_uri(MBIDS[0]))
+
+    assert uri == "file:///local:track:1"
+    assert (
+        lb_backend.playback.translate_uri(get_recording_uri(MBIDS[1])) is None
+    )
+
+
+def test_recording_track_has_mbid():
+    track = get_recording_track(MBIDS[0])
+
+    assert str(track.musicbrainz_id) == MBIDS[0]
+    assert get_recording_track("not-an-mbid").musicbrainz_id is None
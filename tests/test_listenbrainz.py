@@ -0,0 +1,429 @@
+import json
+import time
+from unittest import mock
+
+import httpx
+import pytest
+
+from mopidy_listenbrainz import listenbrainz as listenbrainz_lib
+from mopidy_listenbrainz.cache import ResponseCache
+from mopidy_listenbrainz.listenbrainz import (
+    Listenbrainz,
+    PlaylistData,
+    PreparedListen,
+    RateLimiter,
+    TrackMetadata,
+    _RequestError,
+    build_listen,
+    count_first_batch,
+    get_http_client,
+    get_playlist_last_modified,
+    iter_playlist_dtos,
+)
+
+
+def test_count_first_batch_limits_listen_count():
+    listens = [
+        build_listen("Track", "Artist", listened_at=i) for i in range(1500)
+    ]
+
+    assert (
+        count_first_batch(listens) == listenbrainz_lib.MAX_LISTENS_PER_REQUEST
+    )
+    assert count_first_batch(listens[:10]) == 10
+    assert count_first_batch([]) == 0
+
+
+def test_count_first_batch_limits_payload_size(monkeypatch):
+    monkeypatch.setattr(listenbrainz_lib, "MAX_LISTEN_PAYLOAD_SIZE", 1000)
+    listens = [
+        build_listen("Track", "Artist", listened_at=i) for i in range(10)
+    ]
+
+    count = count_first_batch(listens)
+
+    assert 0 < count < 10
+
+
+def test_count_first_batch_counts_oversized_listen():
+    listens = [build_listen("Track" * 10000, "Artist", listened_at=0)]
+
+    assert count_first_batch(listens) == 1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(listenbrainz_lib.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(listenbrainz_lib.time, "sleep", clock.sleep)
+    return clock
+
+
+@pytest.fixture
+def api():
+    """Route Listenbrainz client requests to ``api.handler``."""
+    api = mock.Mock()
+    api.handler.return_value = httpx.Response(200, json={})
+    api.transport = httpx.MockTransport(lambda r: api.handler(r))
+    return api
+
+
+@pytest.fixture
+def lb(api):
+    lb = Listenbrainz("token", "api.example.org", {}, transport=api.transport)
+    lb.user_name = "user"
+    return lb
+
+
+def rate_limited_response(status_code, remaining, reset_in):
+    return httpx.Response(
+        status_code,
+        headers={
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset-In": str(reset_in),
+        },
+        json={},
+    )
+
+
+def test_rate_limiter_waits_for_reset_once_exhausted(clock):
+    limiter = RateLimiter()
+    limiter.update(rate_limited_response(200, 1, 5))
+
+    limiter.acquire()
+    assert clock.sleeps == []
+
+    limiter.acquire()
+    assert clock.sleeps == [5]
+
+
+def test_rate_limiter_blocks_after_too_many_requests(clock):
+    limiter = RateLimiter()
+    limiter.update(httpx.Response(429), attempt=2)
+
+    limiter.acquire()
+
+    assert clock.sleeps == [4 * listenbrainz_lib.RATE_LIMIT_DEFAULT_DELAY]
+
+
+def test_request_is_retried_after_too_many_requests(clock, api, lb):
+    api.handler.side_effect = [
+        rate_limited_response(429, 0, 3),
+        httpx.Response(200, json={}),
+    ]
+
+    assert lb.submit_listen("Track", "Artist", listened_at=1)
+
+    assert api.handler.call_count == 2
+    assert clock.sleeps == [3]
+
+
+def test_request_gives_up_after_too_many_retries(clock, api, lb):
+    api.handler.return_value = rate_limited_response(429, 0, 1)
+
+    assert not lb.submit_listen("Track", "Artist", listened_at=1)
+
+    assert api.handler.call_count == listenbrainz_lib.RATE_LIMITED_RETRIES + 1
+
+
+def playlist_response(playlist_id, title, delay=0):
+    time.sleep(delay)
+    return httpx.Response(
+        200,
+        json={
+            "playlist": {
+                "identifier": f"https://listenbrainz.org/playlist/{playlist_id}",
+                "title": title,
+                "date": "2024-01-01T00:00:00+00:00",
+                "track": [
+                    {"identifier": "https://musicbrainz.org/recording/mbid"}
+                ],
+            }
+        },
+    )
+
+
+def test_playlists_are_fetched_concurrently_in_order(api, lb):
+    def handler(request):
+        path = request.url.path
+        if path == "/1/user/user/playlists/createdfor":
+            return httpx.Response(
+                200,
+                json={
+                    "playlists": [
+                        {
+                            "playlist": {
+                                "identifier": f"https://listenbrainz.org/playlist/{i}"
+                            }
+                        }
+                        for i in ("slow", "fast")
+                    ]
+                },
+            )
+        elif path == "/1/playlist/slow":
+            return playlist_response("slow", "Slow", delay=0.1)
+        elif path == "/1/playlist/fast":
+            return playlist_response("fast", "Fast")
+        return httpx.Response(404)
+
+    api.handler.side_effect = handler
+
+    (summaries,) = lb.iter_playlist_summary_pages_created_for_user()
+    playlists = lb.fetch_playlists(summaries, concurrency=2)
+
+    assert [p.name for p in playlists] == ["Slow", "Fast"]
+    assert playlists[0].track_mbids == ["mbid"]
+
+
+def test_validate_token_raises_when_api_is_unreachable(api, lb):
+    api.handler.side_effect = httpx.ConnectError("unreachable")
+
+    with pytest.raises(_RequestError):
+        lb.validate_token()
+
+
+def test_validate_token_retrieves_user_name(api):
+    api.handler.return_value = httpx.Response(
+        200, json={"valid": True, "user_name": "someone"}
+    )
+    lb = Listenbrainz("token", "api.example.org", {}, transport=api.transport)
+
+    assert lb.validate_token()
+    assert lb.user_name == "someone"
+
+
+def test_playlist_last_modified_prefers_extension_date():
+    dto = {
+        "date": "2024-01-01T00:00:00+00:00",
+        "extension": {
+            listenbrainz_lib.MUSICBRAINZ_PLAYLIST_EXTENSION_URL: {
+                "last_modified_at": "2024-01-02T00:00:00+00:00"
+            }
+        },
+    }
+
+    assert get_playlist_last_modified(dto) == 1704153600
+
+
+def test_playlist_last_modified_falls_back_to_creation_date():
+    assert get_playlist_last_modified(
+        {"date": "2024-01-01T00:00:00+00:00"}
+    ) == (1704067200)
+    assert get_playlist_last_modified({}) is None
+
+
+def test_playlist_summaries_are_listed_without_fetching_tracks(api, lb):
+    api.handler.return_value = httpx.Response(
+        200,
+        json={
+            "playlists": [
+                {
+                    "playlist": {
+                        "identifier": "https://listenbrainz.org/playlist/id",
+                        "date": "2024-01-01T00:00:00+00:00",
+                    }
+                }
+            ]
+        },
+    )
+
+    (summaries,) = lb.iter_playlist_summary_pages_created_for_user()
+
+    assert [(s.playlist_id, s.last_modified) for s in summaries] == [
+        ("id", 1704067200)
+    ]
+    assert api.handler.call_count == 1
+
+
+def test_playlist_summaries_are_listed_by_pages(api, lb):
+    def handler(request):
+        offset = int(request.url.params["offset"])
+        count = int(request.url.params["count"])
+        playlist_ids = ["1", "2", "3"][offset : offset + count]
+        return httpx.Response(
+            200,
+            json={
+                "playlists": [
+                    {
+                        "playlist": {
+                            "identifier": f"https://listenbrainz.org/playlist/{i}"
+                        }
+                    }
+                    for i in playlist_ids
+                ]
+            },
+        )
+
+    api.handler.side_effect = handler
+
+    pages = lb.iter_playlist_summary_pages_created_for_user(page_size=2)
+
+    assert [s.playlist_id for s in next(pages)] == ["1", "2"]
+    assert api.handler.call_count == 1
+    assert [s.playlist_id for s in next(pages)] == ["3"]
+    assert list(pages) == []
+    assert api.handler.call_count == 2
+
+
+def test_playlist_is_fetched_with_conditional_request(tmp_path, api):
+    lb = Listenbrainz(
+        "token",
+        "api.example.org",
+        {},
+        response_cache=ResponseCache(tmp_path / "responses.sqlite3"),
+        transport=api.transport,
+    )
+    body = playlist_response("id", "Playlist").content
+    api.handler.side_effect = [
+        httpx.Response(200, content=body, headers={"ETag": '"v1"'}),
+        httpx.Response(304),
+    ]
+
+    first = lb._collect_playlist_data("https://listenbrainz.org/playlist/id")
+    second = lb._collect_playlist_data("https://listenbrainz.org/playlist/id")
+
+    assert first == second
+    assert first is not None and first.name == "Playlist"
+    request = api.handler.mock_calls[1].args[0]
+    assert request.headers["If-None-Match"] == '"v1"'
+
+
+PLAYLIST_BODY = json.dumps(
+    {
+        "playlist": {
+            "identifier": "https://listenbrainz.org/playlist/id",
+            "title": "Playlist",
+            "creator": "ListenBrainz",
+            "date": "2024-01-01T00:00:00+00:00",
+            "extension": {
+                listenbrainz_lib.MUSICBRAINZ_PLAYLIST_EXTENSION_URL: {
+                    "last_modified_at": "2024-01-02T00:00:00+00:00",
+                    "public": True,
+                }
+            },
+            "track": [
+                {"identifier": "https://musicbrainz.org/recording/mbid-1"},
+                {
+                    "identifier": [
+                        "https://example.org/track",
+                        "https://musicbrainz.org/recording/mbid-2",
+                    ],
+                    "title": "Two",
+                    "creator": "Artist",
+                    "album": "Album",
+                },
+            ],
+        }
+    }
+).encode()
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_playlist_is_parsed_with_or_without_ijson(
+    monkeypatch, api, lb, streaming
+):
+    if not streaming:
+        monkeypatch.setattr(listenbrainz_lib, "ijson", None)
+    elif listenbrainz_lib.ijson is None:
+        pytest.skip("ijson isn't installed")
+    api.handler.return_value = httpx.Response(200, content=PLAYLIST_BODY)
+
+    playlist_data = lb._collect_playlist_data(
+        "https://listenbrainz.org/playlist/id"
+    )
+
+    assert playlist_data == PlaylistData(
+        "id",
+        "Playlist",
+        ["mbid-1", "mbid-2"],
+        1704153600,
+        {"mbid-2": TrackMetadata("Two", "Artist", "Album")},
+    )
+
+
+def test_playlist_is_streamed_unless_cached(api, lb):
+    api.handler.side_effect = lambda r: httpx.Response(
+        200, content=iter([PLAYLIST_BODY]), headers={"ETag": '"v1"'}
+    )
+
+    response = lb._get("/1/playlist/id")
+    with pytest.raises(httpx.ResponseNotRead):
+        response.content
+    response.close()
+    playlist_data = lb._collect_playlist_data(
+        "https://listenbrainz.org/playlist/id"
+    )
+
+    assert playlist_data is not None and playlist_data.name == "Playlist"
+
+
+def test_playlist_dtos_are_parsed_across_chunks():
+    chunks = [PLAYLIST_BODY[i : i + 7] for i in range(0, len(PLAYLIST_BODY), 7)]
+
+    dtos = list(iter_playlist_dtos(chunks, listenbrainz_lib.PLAYLIST_PREFIX))
+
+    assert [dto["title"] for dto in dtos] == ["Playlist"]
+
+
+def test_prepared_listen_builds_listens_sharing_track_metadata():
+    listen = PreparedListen("Track", "Artist", "Release", "mbid")
+
+    playing_now = listen.build()
+    single = listen.build(listened_at=1)
+
+    assert playing_now == {
+        "track_metadata": {
+            "track_name": "Track",
+            "artist_name": "Artist",
+            "release_name": "Release",
+            "additional_info": {
+                **listenbrainz_lib.ADDITIONAL_INFO,
+                "track_mbid": "mbid",
+            },
+        }
+    }
+    assert single == {**playing_now, "listened_at": 1}
+    assert single["track_metadata"] is playing_now["track_metadata"]
+    assert "track_mbid" not in listenbrainz_lib.ADDITIONAL_INFO
+
+
+def test_requests_use_endpoint_timeouts(api, lb):
+    lb.post_listens("single", [build_listen("Track", "Artist", listened_at=1)])
+    lb.validate_token()
+
+    timeouts = [c.args[0].extensions["timeout"] for c in api.handler.mock_calls]
+    assert timeouts == [
+        listenbrainz_lib.SUBMISSION_TIMEOUT.as_dict(),
+        listenbrainz_lib.DEFAULT_TIMEOUT.as_dict(),
+    ]
+    assert timeouts[0]["read"] < timeouts[1]["read"]
+
+
+def test_connection_limits_are_configurable(api):
+    limits = httpx.Limits(max_connections=2, max_keepalive_connections=1)
+
+    with mock.patch.object(
+        listenbrainz_lib, "get_http_client", wraps=get_http_client
+    ) as get_client:
+        Listenbrainz(
+            "token",
+            "api.example.org",
+            {},
+            transport=api.transport,
+            limits=limits,
+        )
+
+    assert get_client.call_args.kwargs["limits"] is limits
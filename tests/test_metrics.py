@@ -0,0 +1,73 @@
+import pytest
+
+from mopidy_listenbrainz import metrics as metrics_lib
+from mopidy_listenbrainz.metrics import Registry
+
+
+def test_counter_is_rendered_by_labels():
+    registry = Registry()
+    counter = registry.counter("requests_total", "Requests")
+
+    counter.inc(method="GET", status="200")
+    counter.inc(2, method="GET", status="200")
+    counter.inc(method="POST", status="500")
+
+    assert registry.render() == (
+        "# HELP requests_total Requests\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{method="GET",status="200"} 3\n'
+        'requests_total{method="POST",status="500"} 1\n'
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latency", [0.1, 1])
+
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        "latency_seconds_sum 5.55",
+        "latency_seconds_count 3",
+    ]
+
+
+def test_callback_metrics_are_read_on_render():
+    registry = Registry()
+    values = iter([1, 2])
+    registry.gauge_callback("depth", "Depth", lambda: next(values))
+
+    assert "depth 1\n" in registry.render()
+    assert "depth 2\n" in registry.render()
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.counter("total", "Total").inc(name='a "b"\n')
+
+    assert 'total{name="a \\"b\\"\\n"} 1' in registry.render()
+
+
+def test_instrumented_functions_are_timed_and_failures_counted():
+    @metrics_lib.instrumented("test_operation")
+    def operation(fail):
+        if fail:
+            raise RuntimeError("boom")
+        return "done"
+
+    before = metrics_lib.OPERATION_SECONDS.get_count(operation="test_operation")
+
+    assert operation(False) == "done"
+    with pytest.raises(RuntimeError):
+        operation(True)
+
+    assert (
+        metrics_lib.OPERATION_SECONDS.get_count(operation="test_operation")
+        == before + 2
+    )
+    assert metrics_lib.OPERATION_FAILURES.get(operation="test_operation") >= 1
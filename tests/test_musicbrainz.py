@@ -0,0 +1,102 @@
+from unittest import mock
+
+import musicbrainzngs
+import pytest
+
+from mopidy_listenbrainz import musicbrainz as musicbrainz_lib
+from mopidy_listenbrainz.musicbrainz import MusicBrainzClient, RecordingData
+
+
+@pytest.fixture
+def sleep(monkeypatch):
+    sleep = mock.Mock()
+    monkeypatch.setattr(musicbrainz_lib.time, "sleep", sleep)
+    return sleep
+
+
+@pytest.fixture
+def mb(monkeypatch):
+    mb = mock.Mock()
+    monkeypatch.setattr(
+        musicbrainz_lib.musicbrainzngs, "search_recordings", mb.search
+    )
+    monkeypatch.setattr(
+        musicbrainz_lib.musicbrainzngs, "get_recording_by_id", mb.get
+    )
+    return mb
+
+
+def recording(mbid, title):
+    return {"id": mbid, "title": title, "artist-credit-phrase": "Artist"}
+
+
+def test_recordings_are_searched_in_a_single_request(sleep, mb):
+    mb.search.return_value = {
+        "recording-list": [recording("a", "A"), recording("b", "B")]
+    }
+    client = MusicBrainzClient()
+
+    recordings = client.get_recordings(["a", "b"])
+
+    assert recordings == {
+        "a": RecordingData("a", "A", "Artist"),
+        "b": RecordingData("b", "B", "Artist"),
+    }
+    mb.search.assert_called_once_with(query="rid:a OR rid:b", limit=2)
+    mb.get.assert_not_called()
+
+
+def test_recordings_missing_from_search_are_looked_up(sleep, mb):
+    mb.search.return_value = {"recording-list": [recording("a", "A")]}
+    mb.get.side_effect = musicbrainzngs.ResponseError()
+    client = MusicBrainzClient()
+
+    recordings = client.get_recordings(["a", "b"])
+
+    assert list(recordings) == ["a"]
+    mb.get.assert_called_once_with("b", includes=["artists"])
+    assert sleep.call_count == 1  # requests are spaced
+
+
+def test_recordings_are_cached(tmp_path, sleep, mb):
+    mb.search.return_value = {"recording-list": [recording("a", "A")]}
+    mb.get.side_effect = musicbrainzngs.ResponseError()
+    client = MusicBrainzClient(tmp_path / "musicbrainz.sqlite3")
+    client.get_recordings(["a", "b"])
+    client.close()
+    mb.reset_mock()
+
+    client = MusicBrainzClient(tmp_path / "musicbrainz.sqlite3")
+    recordings = client.get_recordings(["a", "b"])
+
+    assert list(recordings) == ["a"]
+    mb.search.assert_not_called()
+    mb.get.assert_not_called()
+
+
+def test_cache_evicts_least_recently_used_recordings(monkeypatch, sleep, mb):
+    monkeypatch.setattr(
+        musicbrainz_lib.time, "time", mock.Mock(side_effect=range(100))
+    )
+    mb.search.side_effect = lambda query, limit: {
+        "recording-list": [recording(query[len("rid:") :], "Title")]
+    }
+    client = MusicBrainzClient(max_entries=2)
+    client.get_recordings(["a"])
+    client.get_recordings(["b"])
+    client.get_recordings(["a"])
+    client.get_recordings(["c"])
+    mb.reset_mock()
+
+    client.get_recordings(["a", "b", "c"])
+
+    mb.search.assert_called_once_with(query="rid:b", limit=1)
+
+
+def test_failed_requests_are_not_cached(sleep, mb):
+    mb.search.side_effect = musicbrainzngs.NetworkError()
+    client = MusicBrainzClient()
+
+    assert client.get_recordings(["a"]) == {}
+    assert client.get_recordings(["a"]) == {}
+    assert mb.search.call_count == 2
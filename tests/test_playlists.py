@@ -0,0 +1,183 @@
+import json
+from unittest import mock
+
+import pytest
+from mopidy.backend import BackendListener
+from mopidy.models import Playlist, Ref, Track
+
+from mopidy_listenbrainz.playlists import ListenbrainzPlaylistsProvider
+
+URI_1 = "listenbrainz:playlist:recommendation:1"
+URI_2 = "listenbrainz:playlist:recommendation:2"
+
+
+@pytest.fixture
+def provider():
+    backend = mock.Mock(uri_schemes=["listenbrainz"])
+    return ListenbrainzPlaylistsProvider(backend)
+
+
+def test_as_list_keeps_creation_order(provider):
+    provider.create(URI_2)
+    provider.create(URI_1)
+
+    assert provider.as_list() == [
+        Ref.playlist(uri=URI_2, name=URI_2),
+        Ref.playlist(uri=URI_1, name=URI_1),
+    ]
+
+
+def test_create_rejects_foreign_uris(provider):
+    assert provider.create("local:playlist:1") is None
+    assert provider.as_list() == []
+
+
+def test_lookup(provider):
+    playlist = provider.create(URI_1)
+
+    assert provider.lookup(URI_1) == playlist
+    assert provider.lookup(URI_2) is None
+
+
+def test_save_replaces_playlist_in_place(provider):
+    provider.create(URI_1)
+    provider.create(URI_2)
+    playlist = Playlist(
+        uri=URI_1, name="Weekly Jams", tracks=[Track(uri="local:track:1")]
+    )
+
+    assert provider.save(playlist) == playlist
+
+    assert provider.lookup(URI_1) == playlist
+    assert [ref.name for ref in provider.as_list()] == ["Weekly Jams", URI_2]
+
+
+def test_save_unknown_playlist(provider):
+    assert provider.save(Playlist(uri=URI_1, name="Weekly Jams")) is None
+
+
+def test_save_keeps_recommendation_when_no_new_track(provider):
+    provider.create(URI_1)
+    tracks = [Track(uri="local:track:1")]
+    saved = provider.save(Playlist(uri=URI_1, name="Jams", tracks=tracks))
+
+    assert provider.save(Playlist(uri=URI_1, name="Other", tracks=tracks)) == (
+        saved
+    )
+
+
+def test_delete(provider):
+    provider.create(URI_1)
+
+    assert provider.delete(URI_1)
+    assert not provider.delete(URI_1)
+    assert provider.lookup(URI_1) is None
+    assert provider.as_list() == []
+
+
+def test_save_replaces_recommendation_when_modified(provider):
+    provider.create(URI_1)
+    tracks = [Track(uri="local:track:1")]
+    provider.save(
+        Playlist(uri=URI_1, name="Jams", tracks=tracks, last_modified=1)
+    )
+    modified = Playlist(uri=URI_1, name="Jams", tracks=tracks, last_modified=2)
+
+    assert provider.save(modified) == modified
+
+
+def test_replace_recommendations_swaps_playlists_at_once(provider, monkeypatch):
+    send = mock.Mock()
+    monkeypatch.setattr(BackendListener, "send", send)
+    provider.create(URI_1)
+    tracks = [Track(uri="local:track:1")]
+    kept = provider.save(
+        Playlist(uri=URI_1, name="Jams", tracks=tracks, last_modified=1)
+    )
+    provider.create(URI_2)
+    new = Playlist(uri=URI_2, name="New", tracks=tracks, last_modified=1)
+
+    playlists = provider.replace_recommendations(
+        [
+            new,
+            Playlist(uri=URI_1, name="Other", tracks=tracks, last_modified=1),
+            Playlist(uri="local:playlist:1", name="Foreign"),
+        ]
+    )
+
+    assert playlists == [new, kept]
+    assert provider.as_list() == [
+        Ref.playlist(uri=URI_2, name="New"),
+        Ref.playlist(uri=URI_1, name="Jams"),
+    ]
+    send.assert_called_once_with("playlists_loaded")
+
+
+def test_replace_recommendations_does_nothing_when_unchanged(
+    provider, monkeypatch
+):
+    send = mock.Mock()
+    monkeypatch.setattr(BackendListener, "send", send)
+    tracks = [Track(uri="local:track:1")]
+    playlist = Playlist(uri=URI_1, name="Jams", tracks=tracks, last_modified=1)
+    provider.replace_recommendations([playlist])
+    send.reset_mock()
+    write_snapshot = mock.Mock()
+    monkeypatch.setattr(provider, "_write_snapshot", write_snapshot)
+
+    assert provider.replace_recommendations([playlist]) == [playlist]
+
+    send.assert_not_called()
+    write_snapshot.assert_not_called()
+
+
+def test_replace_recommendations_deletes_missing_playlists(provider):
+    provider.create(URI_1)
+
+    assert provider.replace_recommendations([]) == []
+    assert provider.lookup(URI_1) is None
+
+
+def test_playlists_are_restored_from_snapshot(tmp_path):
+    backend = mock.Mock(uri_schemes=["listenbrainz"])
+    path = tmp_path / "playlists.json"
+    provider = ListenbrainzPlaylistsProvider(backend, snapshot_path=path)
+    provider.create(URI_1)
+    provider.create(URI_2)
+    playlist = Playlist(
+        uri=URI_2,
+        name="Weekly Jams",
+        tracks=[Track(uri="local:track:1", name="One")],
+        last_modified=1,
+    )
+    provider.save(playlist)
+    provider.delete(URI_1)
+
+    restored = ListenbrainzPlaylistsProvider(backend, snapshot_path=path)
+
+    assert restored.as_list() == [Ref.playlist(uri=URI_2, name="Weekly Jams")]
+    assert restored.lookup(URI_2) == playlist
+
+
+def test_invalid_snapshot_is_ignored(tmp_path):
+    backend = mock.Mock(uri_schemes=["listenbrainz"])
+    path = tmp_path / "playlists.json"
+    path.write_text("{")
+
+    provider = ListenbrainzPlaylistsProvider(backend, snapshot_path=path)
+
+    assert provider.as_list() == []
+
+
+def test_snapshot_of_other_version_is_ignored(tmp_path):
+    backend = mock.Mock(uri_schemes=["listenbrainz"])
+    path = tmp_path / "playlists.json"
+    path.write_text(
+        json.dumps(
+            {"version": 0, "playlists": [Playlist(uri=URI_1).serialize()]}
+        )
+    )
+
+    provider = ListenbrainzPlaylistsProvider(backend, snapshot_path=path)
+
+    assert provider.as_list() == []
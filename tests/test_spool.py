@@ -0,0 +1,31 @@
+from mopidy_listenbrainz.spool import ListenSpool
+
+
+def test_spool_returns_listens_in_insertion_order(tmp_path):
+    spool = ListenSpool(tmp_path / "spool.sqlite3")
+
+    spool.append({"listened_at": 1})
+    spool.append({"listened_at": 2})
+    spool.append({"listened_at": 3})
+
+    assert len(spool) == 3
+    entries = spool.peek(2)
+    assert [listen for _, listen in entries] == [
+        {"listened_at": 1},
+        {"listened_at": 2},
+    ]
+
+    spool.remove([listen_id for listen_id, _ in entries])
+    assert [listen for _, listen in spool.peek(10)] == [{"listened_at": 3}]
+
+
+def test_spool_survives_reopening(tmp_path):
+    path = tmp_path / "spool.sqlite3"
+    spool = ListenSpool(path)
+    spool.append({"listened_at": 1})
+    spool.close()
+
+    spool = ListenSpool(path)
+
+    assert len(spool) == 1
+    assert [listen for _, listen in spool.peek(1)] == [{"listened_at": 1}]
@@ -0,0 +1,290 @@
+import time
+from threading import Event
+from unittest import mock
+
+import httpx
+
+from mopidy_listenbrainz import submission as submission_lib
+from mopidy_listenbrainz.listenbrainz import (
+    Listenbrainz,
+    PreparedListen,
+    _RequestError,
+)
+from mopidy_listenbrainz.metrics import Registry
+from mopidy_listenbrainz.spool import ListenSpool
+from mopidy_listenbrainz.submission import ListenSubmitter
+
+
+def test_submit_is_done_by_worker():
+    lb = mock.Mock()
+    lb.send_listen.return_value = True
+    submitter = ListenSubmitter(lb, max_queue_size=10)
+    submitter.start()
+    listen = PreparedListen("Track", "Artist")
+
+    assert submitter.submit(listen)
+
+    submitter.stop(timeout=1)
+    lb.send_listen.assert_called_once_with(
+        listen, now_playing=False, listened_at=None
+    )
+    stats = submitter.stats()
+    assert stats.submitted_count == 1
+    assert stats.failed_count == 0
+    assert stats.queue_depth == 0
+    assert stats.last_latency is not None
+
+
+def test_submit_drops_listens_when_queue_is_full():
+    lb = mock.Mock()
+    submitter = ListenSubmitter(lb, max_queue_size=1)
+
+    assert submitter.submit(PreparedListen("Track 1", "Artist"))
+    assert not submitter.submit(PreparedListen("Track 2", "Artist"))
+
+    stats = submitter.stats()
+    assert stats.queue_depth == 1
+    assert stats.dropped_count == 1
+
+
+def test_submission_failures_are_counted():
+    lb = mock.Mock()
+    lb.send_listen.side_effect = [RuntimeError("boom"), False]
+    submitter = ListenSubmitter(lb, max_queue_size=10)
+    submitter.start()
+
+    submitter.submit(PreparedListen("Track 1", "Artist"))
+    submitter.submit(PreparedListen("Track 2", "Artist"))
+
+    submitter.stop(timeout=1)
+    stats = submitter.stats()
+    assert stats.submitted_count == 0
+    assert stats.failed_count == 2
+
+
+def test_submit_does_not_wait_for_submission():
+    submission_started = Event()
+    release = Event()
+    lb = mock.Mock()
+
+    def slow_send_listen(*args, **kwargs):
+        submission_started.set()
+        release.wait(timeout=1)
+        return True
+
+    lb.send_listen.side_effect = slow_send_listen
+    submitter = ListenSubmitter(lb, max_queue_size=10)
+    submitter.start()
+
+    submitter.submit(PreparedListen("Track 1", "Artist"))
+    submission_started.wait(timeout=1)
+    assert submitter.submit(PreparedListen("Track 2", "Artist"))
+    assert submitter.stats().queue_depth == 1
+
+    release.set()
+    submitter.stop(timeout=1)
+    assert submitter.stats().submitted_count == 2
+
+
+class FakeListenbrainz:
+    def __init__(self, failures):
+        self.failures = list(failures)
+        self.submitted = []
+
+    def post_listens(self, listen_type, payload):
+        failure = self.failures.pop(0) if self.failures else None
+        if failure is not None:
+            raise failure
+        self.submitted.extend(listen["listened_at"] for listen in payload)
+
+    def import_listens(self, listens):
+        self.post_listens("import", listens)
+        return len(listens)
+
+
+def wait_until(predicate):
+    deadline = time.monotonic() + 1
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def wait_for_submissions(submitter, count):
+    wait_until(lambda: submitter.stats().submitted_count >= count)
+
+
+def test_failed_listens_are_spooled_and_replayed_in_order(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setattr(submission_lib, "REPLAY_MIN_DELAY", 0)
+    lb = FakeListenbrainz([_RequestError(503), _RequestError(None)])
+    spool = ListenSpool(tmp_path / "spool.sqlite3")
+    submitter = ListenSubmitter(lb, max_queue_size=10, spool=spool)
+    submitter.start()
+
+    submitter.submit(PreparedListen("Track 1", "Artist"), listened_at=1)
+    submitter.submit(PreparedListen("Track 2", "Artist"), listened_at=2)
+    submitter.submit(PreparedListen("Track 3", "Artist"), listened_at=3)
+
+    wait_for_submissions(submitter, 3)
+    submitter.stop(timeout=1)
+    assert lb.submitted == [1, 2, 3]
+    assert submitter.stats().spool_depth == 0
+
+
+def test_spooled_listens_are_replayed_in_batches(tmp_path):
+    spool = ListenSpool(tmp_path / "spool.sqlite3")
+    for listened_at in range(5):
+        spool.append({"listened_at": listened_at})
+    lb = mock.Mock()
+    lb.import_listens.side_effect = [2, 3]
+    submitter = ListenSubmitter(lb, max_queue_size=10, spool=spool)
+    submitter.start()
+
+    wait_for_submissions(submitter, 5)
+    submitter.stop(timeout=1)
+    assert lb.import_listens.call_count == 2
+    assert len(lb.import_listens.mock_calls[1].args[0]) == 3
+    assert len(spool) == 0
+
+
+def test_rejected_spooled_listen_is_dropped(tmp_path):
+    spool = ListenSpool(tmp_path / "spool.sqlite3")
+    for listened_at in range(3):
+        spool.append({"listened_at": listened_at})
+    lb = FakeListenbrainz([_RequestError(400), None, _RequestError(400)])
+    submitter = ListenSubmitter(lb, max_queue_size=10, spool=spool)
+    submitter.start()
+
+    wait_for_submissions(submitter, 2)
+    submitter.stop(timeout=1)
+    assert lb.submitted == [0, 2]
+    assert submitter.stats().failed_count == 1
+
+
+def test_spool_is_kept_when_token_is_rejected(tmp_path):
+    spool = ListenSpool(tmp_path / "spool.sqlite3")
+    for listened_at in range(20):
+        spool.append({"listened_at": listened_at})
+    lb = mock.Mock()
+    lb.import_listens.side_effect = _RequestError(401)
+    submitter = ListenSubmitter(lb, max_queue_size=10, spool=spool)
+    submitter.start()
+
+    wait_until(lambda: lb.import_listens.called)
+    submitter.stop(timeout=1)
+    assert lb.import_listens.call_count == 1
+    assert len(spool) == 20
+    assert submitter.stats().failed_count == 0
+
+
+def test_spool_is_kept_when_single_listen_replay_fails(tmp_path):
+    spool = ListenSpool(tmp_path / "spool.sqlite3")
+    for listened_at in range(3):
+        spool.append({"listened_at": listened_at})
+    lb = FakeListenbrainz([_RequestError(400), _RequestError(401)])
+    submitter = ListenSubmitter(lb, max_queue_size=10, spool=spool)
+    submitter.start()
+
+    wait_until(lambda: len(lb.failures) == 0)
+    submitter.stop(timeout=1)
+    assert len(spool) == 3
+    assert submitter.stats().failed_count == 0
+
+
+def test_rejected_listens_are_not_spooled(tmp_path):
+    lb = mock.Mock()
+    lb.post_listens.side_effect = _RequestError(400)
+    spool = ListenSpool(tmp_path / "spool.sqlite3")
+    submitter = ListenSubmitter(lb, max_queue_size=10, spool=spool)
+    submitter.start()
+
+    submitter.submit(PreparedListen("Track 1", "Artist"), listened_at=1)
+
+    submitter.stop(timeout=1)
+    stats = submitter.stats()
+    assert stats.failed_count == 1
+    assert stats.spool_depth == 0
+
+
+def test_queued_listens_are_spooled_when_queue_is_full_before_start(
+    tmp_path,
+):
+    spool = ListenSpool(tmp_path / "spool.sqlite3")
+    submitter = ListenSubmitter(mock.Mock(), max_queue_size=1, spool=spool)
+
+    submitter.submit(PreparedListen("Track 1", "Artist"), listened_at=1)
+    assert submitter.submit(PreparedListen("Track 2", "Artist"), listened_at=2)
+
+    assert [listen["listened_at"] for _, listen in spool.peek(10)] == [1, 2]
+    stats = submitter.stats()
+    assert stats.queue_depth == 0
+    assert stats.dropped_count == 0
+
+
+def test_queued_listens_are_spooled_when_stopped_before_start(tmp_path):
+    spool = ListenSpool(tmp_path / "spool.sqlite3")
+    submitter = ListenSubmitter(mock.Mock(), max_queue_size=10, spool=spool)
+
+    submitter.submit(PreparedListen("Track", "Artist"), now_playing=True)
+    submitter.submit(PreparedListen("Track", "Artist"), listened_at=1)
+    submitter.stop(timeout=1)
+
+    assert [listen["listened_at"] for _, listen in spool.peek(10)] == [1]
+
+
+def test_submission_stats_are_exposed_as_metrics():
+    registry = Registry()
+    submitter = ListenSubmitter(mock.Mock(), max_queue_size=1)
+    submitter.submit(PreparedListen("Track 1", "Artist"))
+    submitter.submit(PreparedListen("Track 2", "Artist"))
+
+    submitter.register_metrics(registry)
+
+    rendered = registry.render()
+    assert "listenbrainz_submission_queue_depth 1\n" in rendered
+    assert "listenbrainz_submission_dropped_total 1\n" in rendered
+
+
+def test_worker_survives_bad_request_without_json(tmp_path):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if len(requests) == 1:
+            return httpx.Response(400, text="<html>Bad Request</html>")
+        return httpx.Response(200, json={"status": "ok"})
+
+    lb = Listenbrainz(
+        "token", "api.example.org", {}, transport=httpx.MockTransport(handler)
+    )
+    spool = ListenSpool(tmp_path / "spool.sqlite3")
+    submitter = ListenSubmitter(lb, max_queue_size=10, spool=spool)
+    submitter.start()
+
+    submitter.submit(PreparedListen("Track 1", "Artist"), listened_at=1)
+    submitter.submit(PreparedListen("Track 2", "Artist"), listened_at=2)
+
+    wait_for_submissions(submitter, 1)
+    assert submitter._thread.is_alive()
+    submitter.stop(timeout=1)
+    stats = submitter.stats()
+    assert stats.failed_count == 1
+    assert stats.submitted_count == 1
+
+
+def test_worker_survives_spool_failures(tmp_path):
+    lb = mock.Mock()
+    lb.post_listens.side_effect = _RequestError(503)
+    spool = mock.Mock()
+    spool.__len__ = mock.Mock(return_value=0)
+    spool.append.side_effect = RuntimeError("disk I/O error")
+    submitter = ListenSubmitter(lb, max_queue_size=10, spool=spool)
+    submitter.start()
+
+    submitter.submit(PreparedListen("Track 1", "Artist"), listened_at=1)
+    submitter.submit(PreparedListen("Track 2", "Artist"), listened_at=2)
+
+    wait_until(lambda: submitter.stats().failed_count >= 2)
+    assert submitter._thread.is_alive()
+    submitter.stop(timeout=1)
+    assert submitter.stats().failed_count == 2